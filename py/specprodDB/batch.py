@@ -231,7 +231,7 @@ def prepare_template(options):
     return scripts
 
 
-def write_scripts(scripts, jobs):
+def write_scripts(scripts, jobs, opener=open):
     """Write scripts to job directory.
 
     Parameters
@@ -240,10 +240,13 @@ def write_scripts(scripts, jobs):
         A dictionary mapping file name to contents.
     jobs : :class:`str`
         Name of a directory to write to.
+    opener : callable, optional
+        Called as ``opener(path, 'w')`` to open each script for writing.
+        The default is :func:`open`.
     """
     for s in scripts:
         path = os.path.join(jobs, s)
-        with open(path, 'w') as j:
+        with opener(path, 'w') as j:
             j.write(scripts[s])
 
 
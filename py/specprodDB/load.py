@@ -13,7 +13,6 @@ import glob
 import itertools
 # import sys
 import importlib.resources as ir
-from configparser import SafeConfigParser
 
 import numpy as np
 from astropy import __version__ as astropy_version
@@ -33,15 +32,14 @@ from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, REAL
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from desiutil import __version__ as desiutil_version
-from desiutil.iers import freeze_iers
 from desiutil.names import radec_to_desiname
 from desiutil.log import get_logger, DEBUG, INFO
 
 # from desispec.io.meta import findfile
 
 from . import __version__ as specprodDB_version
-from .util import (common_options, parse_pgpass, cameraid, surveyid, programid,
-                   spgrpid, checkgzip, no_sky)
+from .util import (common_options, parse_pgpass, frameids, surveyid, programid,
+                   spgrpid, checkgzip, no_sky, read_config)
 
 
 # Base = declarative_base()
@@ -240,7 +238,7 @@ class Photometry(SchemaMixin, Base):
         return "Photometry(targetid={0.targetid:d})".format(self)
 
     @classmethod
-    def convert(cls, data, row_index=None):
+    def convert(cls, data, row_index=None, mappings=False):
         """Convert `data` into ORM objects ready for loading.
 
         Parameters
@@ -250,11 +248,15 @@ class Photometry(SchemaMixin, Base):
         row_index: :class:`numpy.ndarray`, optional
             Only convert the rows indexed by `row_index`. If not specified,
             convert all rows.
+        mappings : :class:`bool`, optional
+            If ``True``, return dictionaries keyed by column name instead
+            of ORM objects, suitable for a bulk ``INSERT``.
 
         Returns
         -------
         :class:`list`
-            A list of ORM objects.
+            A list of ORM objects, or a list of :class:`dict` if `mappings`
+            is ``True``.
         """
         if row_index is None:
             row_index = np.arange(len(data))
@@ -281,6 +283,9 @@ class Photometry(SchemaMixin, Base):
                 data_column = data[column.name.upper()][row_index].tolist()
             data_columns.append(data_column)
         data_rows = list(zip(*data_columns))
+        if mappings:
+            column_names = [col.name for col in cls.__table__.columns]
+            return [dict(zip(column_names, row)) for row in data_rows]
         return [cls(**(dict([(col.name, dat) for col, dat in zip(cls.__table__.columns, row)]))) for row in data_rows]
 
 
@@ -329,7 +334,7 @@ class Target(SchemaMixin, Base):
         return "Target(targetid={0.targetid:d}, tileid={0.tileid:d}, survey='{0.survey}')".format(self)
 
     @classmethod
-    def convert(cls, data, survey=None, tileid=None, row_index=None):
+    def convert(cls, data, survey=None, tileid=None, row_index=None, mappings=False):
         """Convert `data` into ORM objects ready for loading.
 
         Parameters
@@ -343,11 +348,15 @@ class Target(SchemaMixin, Base):
         row_index : :class:`numpy.ndarray`, optional
             Only convert the rows indexed by `row_index`. If not specified,
             convert all rows.
+        mappings : :class:`bool`, optional
+            If ``True``, return dictionaries keyed by column name instead
+            of ORM objects, suitable for a bulk ``INSERT``.
 
         Returns
         -------
         :class:`list`
-            A list of ORM objects.
+            A list of ORM objects, or a list of :class:`dict` if `mappings`
+            is ``True``.
 
         Raises
         ------
@@ -393,6 +402,9 @@ class Target(SchemaMixin, Base):
                 data_column = data[column.name.upper()][row_index].tolist()
             data_columns.append(data_column)
         data_rows = list(zip(*data_columns))
+        if mappings:
+            column_names = [col.name for col in cls.__table__.columns]
+            return [dict(zip(column_names, row)) for row in data_rows]
         return [cls(**(dict([(col.name, dat) for col, dat in zip(cls.__table__.columns, row)]))) for row in data_rows]
 
 
@@ -663,8 +675,7 @@ class Frame(SchemaMixin, Base):
         data_columns = list()
         for column in cls.__table__.columns:
             if column.name == 'frameid':
-                data_column = (100*data[row_index]['EXPID'] + np.array([cameraid(c) for c in data[row_index]['CAMERA']],
-                                                                       dtype=data[row_index]['EXPID'].dtype)).tolist()
+                data_column = frameids(data['EXPID'][row_index], data['CAMERA'][row_index]).tolist()
             else:
                 data_column = data[column.name.upper()][row_index].tolist()
             data_columns.append(data_column)
@@ -721,7 +732,7 @@ class Fiberassign(SchemaMixin, Base):
         return "Fiberassign(tileid={0.tileid:d}, targetid={0.targetid:d}, location={0.location:d})".format(self)
 
     @classmethod
-    def convert(cls, data, tileid=None, row_index=None):
+    def convert(cls, data, tileid=None, row_index=None, mappings=False):
         """Convert `data` into ORM objects ready for loading.
 
         Parameters
@@ -733,11 +744,15 @@ class Fiberassign(SchemaMixin, Base):
         row_index : :class:`numpy.ndarray`, optional
             Only convert the rows indexed by `row_index`. If not specified,
             convert all rows.
+        mappings : :class:`bool`, optional
+            If ``True``, return dictionaries keyed by column name instead
+            of ORM objects, suitable for a bulk ``INSERT``.
 
         Returns
         -------
         :class:`list`
-            A list of ORM objects.
+            A list of ORM objects, or a list of :class:`dict` if `mappings`
+            is ``True``.
 
         Raises
         ------
@@ -772,6 +787,9 @@ class Fiberassign(SchemaMixin, Base):
                 data_column = data[column.name.upper()][row_index].tolist()
             data_columns.append(data_column)
         data_rows = list(zip(*data_columns))
+        if mappings:
+            column_names = [col.name for col in cls.__table__.columns]
+            return [dict(zip(column_names, row)) for row in data_rows]
         return [cls(**(dict([(col.name, dat) for col, dat in zip(cls.__table__.columns, row)]))) for row in data_rows]
 
 
@@ -796,7 +814,7 @@ class Potential(SchemaMixin, Base):
         return "Potential(tileid={0.tileid:d}, targetid={0.targetid:d}, location={0.location:d})".format(self)
 
     @classmethod
-    def convert(cls, data, tileid=None, row_index=None):
+    def convert(cls, data, tileid=None, row_index=None, mappings=False):
         """Convert `data` into ORM objects ready for loading.
 
         Parameters
@@ -808,11 +826,15 @@ class Potential(SchemaMixin, Base):
         row_index : :class:`numpy.ndarray`, optional
             Only convert the rows indexed by `row_index`. If not specified,
             convert all rows.
+        mappings : :class:`bool`, optional
+            If ``True``, return dictionaries keyed by column name instead
+            of ORM objects, suitable for a bulk ``INSERT``.
 
         Returns
         -------
         :class:`list`
-            A list of ORM objects.
+            A list of ORM objects, or a list of :class:`dict` if `mappings`
+            is ``True``.
 
         Raises
         ------
@@ -844,6 +866,9 @@ class Potential(SchemaMixin, Base):
                 data_column = data[column.name.upper()][row_index].tolist()
             data_columns.append(data_column)
         data_rows = list(zip(*data_columns))
+        if mappings:
+            column_names = [col.name for col in cls.__table__.columns]
+            return [dict(zip(column_names, row)) for row in data_rows]
         return [cls(**(dict([(col.name, dat) for col, dat in zip(cls.__table__.columns, row)]))) for row in data_rows]
 
 
@@ -1589,7 +1614,7 @@ GRANT SELECT ON ALL SEQUENCES IN SCHEMA {schema} TO desi_public;
     #
     # SQLAlchemy stuff.
     #
-    engine = create_engine(db_connection, echo=verbose)
+    engine = create_engine(db_connection, echo=verbose, insertmanyvalues_page_size=5000)
     dbSession.remove()
     dbSession.configure(bind=engine, autoflush=False, expire_on_commit=False)
     for tab in Base.metadata.tables.values():
@@ -1633,7 +1658,6 @@ def main():
         An integer suitable for passing to :func:`sys.exit`.
     """
     global log
-    freeze_iers()
     #
     # command-line arguments
     #
@@ -1656,19 +1680,21 @@ def main():
     #
     # Read configuration file.
     #
-    config = SafeConfigParser()
-    r = config.read(options.config)
-    if not (r and r[0] == options.config):
+    config = read_config(options.config)
+    if config is None:
         log.critical("Failed to read configuration file: %s!", options.config)
         return 1
     if specprod not in config:
         log.critical("Configuration has no section for '%s'!", specprod)
         return 1
+    specprod_config = config[specprod]
     #
     # Initialize DB
     #
-    postgresql = setup_db(hostname=config[specprod]['hostname'],
-                          username=config[specprod]['username'],
+    from desiutil.iers import freeze_iers
+    freeze_iers()
+    postgresql = setup_db(hostname=specprod_config['hostname'],
+                          username=specprod_config['username'],
                           schema=options.schema,
                           overwrite=options.overwrite,
                           public=options.public,
@@ -1676,14 +1702,12 @@ def main():
     #
     # Load configuration
     #
-    release = config[specprod]['release']
-    photometry_version = config[specprod]['photometry']
-    target_summary = config[specprod].getboolean('target_summary')
-    rsv = config[specprod]['redshift'].split('/')
-    if len(rsv) == 2:
-        redshift_type, redshift_version = rsv[0], rsv[1]
-    else:
-        redshift_type, redshift_version = rsv[0], 'v0'
+    release = specprod_config['release']
+    photometry_version = specprod_config['photometry']
+    target_summary = specprod_config.getboolean('target_summary')
+    redshift_type, separator, redshift_version = specprod_config['redshift'].partition('/')
+    if not separator:
+        redshift_version = 'v0'
     if target_summary:
         target_files = os.path.join(options.datapath, 'vac', release, 'lsdr9-photometry', specprod, photometry_version, 'potential-targets', f'targetphot-potential-{specprod}.fits')
     else:
@@ -1720,8 +1744,8 @@ def main():
         tiles_type = 'csv'
     else:
         tiles_type = 'fits'
-    tiles_version = config[specprod]['tiles']
-    chunksize = config[specprod].getint('chunksize')
+    tiles_version = specprod_config['tiles']
+    chunksize = specprod_config.getint('chunksize')
     loaders = {'exposures': [{'filepaths': os.path.join(options.datapath, 'spectro', 'redux', specprod, f'tiles-{specprod}.{tiles_type}'),
                               'tcls': Tile,
                               'hdu': 'TILE_COMPLETENESS',  # Ignored for CSV files.
@@ -1811,9 +1835,23 @@ def main():
                 fiberassign_dir = d
                 log.info('Found fiberassign directory: %s.', fiberassign_dir)
                 break
+        #
+        # List each three-digit subdirectory once instead of checking
+        # every file individually.
+        #
+        fiberassign_listing = dict()
+        fiberassign_files = list()
         try:
-            fiberassign_files = [checkgzip(os.path.join(fiberassign_dir, (f"{tileid[0]:06d}")[0:3], f"fiberassign-{tileid[0]:06d}.fits"))
-                                 for tileid in dbSession.query(Tile.tileid).order_by(Tile.tileid)]
+            for tileid in dbSession.query(Tile.tileid).order_by(Tile.tileid):
+                fiberassign_subdir = os.path.join(fiberassign_dir, (f"{tileid[0]:06d}")[0:3])
+                if fiberassign_subdir not in fiberassign_listing:
+                    try:
+                        fiberassign_listing[fiberassign_subdir] = {os.path.join(fiberassign_subdir, f)
+                                                                   for f in os.listdir(fiberassign_subdir)}
+                    except FileNotFoundError:
+                        fiberassign_listing[fiberassign_subdir] = set()
+                fiberassign_files.append(checkgzip(os.path.join(fiberassign_subdir, f"fiberassign-{tileid[0]:06d}.fits"),
+                                                   listing=fiberassign_listing[fiberassign_subdir]))
         except FileNotFoundError:
             log.error("Some fiberassign files were not found!")
             return 1
@@ -10,26 +10,78 @@ to the ``daily`` specprod, but others could be patched, in principle.
 import os
 import datetime
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copy2
 from argparse import ArgumentParser
 import numpy as np
 import pytz
-from astropy.table import Table, join
+from astropy.table import Table, MaskedColumn, join
 from astropy.io import fits
 from desiutil.log import get_logger, DEBUG, INFO
 # from desispec.io import read_table
 from desispec.io.meta import faflavor2program
-from specprodDB.util import cameraid
+from specprodDB.util import frameids
 
 
-def match_rows(left, right):
-    """Match rows in `left` to rows in `right`.
+_valid_surveys = np.array(['cmx', 'sv1', 'sv2', 'sv3', 'main', 'special'])
+_valid_programs = np.array(['backup', 'bright', 'dark', 'other'])
+
+
+def _not_in(column, valid):
+    """Identify values in `column` that are not in `valid`.
+
+    Parameters
+    ----------
+    column : array-like
+        A string column.
+    valid : :class:`numpy.ndarray`
+        An array of valid string values.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        A boolean array that is ``True`` where `column` is not valid.
+    """
+    if column.dtype.kind == 'S':
+        #
+        # np.isin() will not match bytes to str.
+        #
+        valid = np.char.encode(valid)
+    return ~np.isin(column, valid)
+
+
+def _probe_rows(build_sorted, build_order, probe):
+    """Look up the values of `probe` in the sorted, unique array `build_sorted`.
 
     Parameters
     ----------
-    src : array-like
+    build_sorted : :class:`numpy.ndarray`
+        Sorted, unique keys.
+    build_order : :class:`numpy.ndarray`
+        The index array that sorts the original keys into `build_sorted`.
+    probe : :class:`numpy.ndarray`
+        Keys to look up.
+
+    Returns
+    -------
+    :class:`tuple`
+        The row indexes of `probe` and of the original, unsorted keys that match.
+    """
+    position = np.searchsorted(build_sorted, probe)
+    position[position == len(build_sorted)] = len(build_sorted) - 1
+    found = build_sorted[position] == probe
+    return (np.flatnonzero(found), build_order[position[found]])
+
+
+def _join_rows(left, right):
+    """Match rows in `left` to rows in `right` with a full join. This
+    handles the case where neither `left` nor `right` is unique.
+
+    Parameters
+    ----------
+    left : array-like
         The column to be matched. This could be "artificial".
-    dst : array-like
+    right : array-like
         The column to be matched. This could be "artificial".
 
     Returns
@@ -50,11 +102,136 @@ def match_rows(left, right):
         good_join = (joined['LEFT_INDEX'] >= 0)
     if hasattr(joined['RIGHT_INDEX'], 'mask'):
         good_join = good_join & (~joined['RIGHT_INDEX'].mask)
-    return (joined['LEFT_INDEX'][good_join], joined['RIGHT_INDEX'][good_join])
+    return (joined['LEFT_INDEX'][good_join].data, joined['RIGHT_INDEX'][good_join].data)
+
+
+def match_rows(left, right):
+    """Match rows in `left` to rows in `right`.
+
+    At least one of `left` or `right` should contain unique values, in which
+    case the match is performed by sorting that side and searching it with
+    the other side. If both are unique, the smaller side is sorted.
+    Otherwise, this falls back to a full join.
+
+    Parameters
+    ----------
+    left : array-like
+        The column to be matched. This could be "artificial".
+    right : array-like
+        The column to be matched. This could be "artificial".
+
+    Returns
+    -------
+    :class:`tuple`
+        The row indexes of `left` and `right` that match.
+    """
+    left = np.asarray(left)
+    right = np.asarray(right)
+    if len(left) == 0 or len(right) == 0:
+        return (np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+    swap = len(left) < len(right)
+    build, probe = (left, right) if swap else (right, left)
+    build_order = np.argsort(build, kind='stable')
+    build_sorted = build[build_order]
+    if (build_sorted[1:] == build_sorted[:-1]).any():
+        #
+        # The smaller side is not unique, so try the larger side.
+        #
+        swap = not swap
+        build, probe = probe, build
+        build_order = np.argsort(build, kind='stable')
+        build_sorted = build[build_order]
+        if (build_sorted[1:] == build_sorted[:-1]).any():
+            return _join_rows(left, right)
+    probe_index, build_index = _probe_rows(build_sorted, build_order, probe)
+    if swap:
+        return (build_index, probe_index)
+    return (probe_index, build_index)
+
+
+def frame_keys(frames):
+    """Compute an integer key for every row in `frames`, equivalent to
+    :func:`~specprodDB.util.frameid`.
+
+    Parameters
+    ----------
+    frames : :class:`~astropy.table.Table` or :class:`dict`
+        A frames table, or any mapping of column name to array, containing
+        ``EXPID`` and ``CAMERA`` columns.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        An array of integer keys.
+    """
+    return frameids(frames['EXPID'], frames['CAMERA'])
+
+
+def _copy_columns(data, columns):
+    """Copy `data`, but only copy the underlying data for `columns`.
+
+    Parameters
+    ----------
+    data : :class:`~astropy.table.Table`
+        A data table.
+    columns : iterable
+        The names of columns that will be modified in the copy.
+
+    Returns
+    -------
+    :class:`~astropy.table.Table`
+        A copy of `data`. Columns not in `columns` share memory with `data`.
+    """
+    copied = data.copy(copy_data=False)
+    for column in columns:
+        copied.replace_column(column, data[column].copy())
+    return copied
+
+
+def _own_column(data, column):
+    """Replace `column` in `data` with a copy, so that in-place writes do not
+    propagate to any table that shares memory with `data`.
+
+    Parameters
+    ----------
+    data : :class:`~astropy.table.Table`
+        A data table, typically returned by :func:`_copy_columns`.
+    column : :class:`str`
+        The name of the column that is about to be modified.
+    """
+    data.replace_column(column, data[column].copy())
+
+
+def _patch_column(dst_column, src_column, dst_index, src_index, need):
+    """Replace values in `dst_column` with matched values from `src_column`.
+
+    Parameters
+    ----------
+    dst_column : :class:`~astropy.table.Column`
+        Column to be patched *in place*.
+    src_column : :class:`~astropy.table.Column`
+        Source of patch values.
+    dst_index : :class:`numpy.ndarray`
+        Indexes of the matched rows in `dst_column`.
+    src_index : :class:`numpy.ndarray`
+        Indexes of the matched rows in `src_column`.
+    need : :class:`numpy.ndarray`
+        Boolean array, the same length as `dst_index`, selecting the
+        matched rows that actually need patching.
+
+    Notes
+    -----
+    If `dst_column` is masked, the patched values are also unmasked.
+    """
+    dst_rows = dst_index[need]
+    dst_column[dst_rows] = src_column[src_index[need]]
+    if hasattr(dst_column, 'mask'):
+        dst_column.mask[dst_rows] = False
 
 
 def zero_fill(data, label):
-    """Fill any masked values in `data` with zero.
+    """Fill any masked values in `data` with zero. Columns that contain
+    masked values are replaced with ordinary, unmasked columns.
 
     Parameters
     ----------
@@ -70,15 +247,35 @@ def zero_fill(data, label):
     """
     log = get_logger()
     for column in data.colnames:
-        if hasattr(data[column], 'mask'):
-            if data[column].mask.any():
+        data_column = data.columns[column]
+        if hasattr(data_column, 'mask'):
+            n_masked = np.count_nonzero(data_column.mask)
+            if n_masked > 0:
                 log.info("Replacing %d masked values in dst_%s column %s with zero.",
-                         np.sum(data[column].mask), label, column)
-                data[column][data[column].mask] = 0
-                data[column].mask[data[column].mask] = False
+                         n_masked, label, column)
+                data.replace_column(column, data_column.filled(0))
     return data
 
 
+def _read_mjd_obs(raw_data_file):
+    """Read ``MJD-OBS`` from the ``SPEC`` header of a raw data file.
+
+    Parameters
+    ----------
+    raw_data_file : :class:`str`
+        Name of a raw data file.
+
+    Returns
+    -------
+    :class:`float`
+        The value of ``MJD-OBS``, or ``None`` if `raw_data_file` does not exist.
+    """
+    try:
+        return fits.getheader(raw_data_file, 'SPEC')['MJD-OBS']
+    except FileNotFoundError:
+        return None
+
+
 def patch_frames(src_frames, dst_frames):
     """Patch frames data in `dst_frames` with the data in `src_frames`.
 
@@ -93,36 +290,32 @@ def patch_frames(src_frames, dst_frames):
     -------
     :class:`~astropy.table.Table`
         A *copy* of `dst_frames` with data replaced from `src_frames`.
+        Columns that cannot be patched share memory with `dst_frames`.
     """
     log = get_logger()
-    src_frames_index, dst_frames_index = match_rows(np.array([100*row['EXPID'] + cameraid(row['CAMERA']) for row in src_frames]),
-                                                    np.array([100*row['EXPID'] + cameraid(row['CAMERA']) for row in dst_frames]))
-    dst_frames_patched = dst_frames.copy()
-    for column in dst_frames_patched.colnames:
-        if (column in src_frames.colnames and hasattr(src_frames[column], 'mask') and np.any(src_frames[column].mask[src_frames_index])):
+    src_frames_index, dst_frames_index = match_rows(frame_keys(src_frames), frame_keys(dst_frames))
+    dst_frames_masked = [c for c in dst_frames.colnames if hasattr(dst_frames[c], 'mask')]
+    dst_frames_patched = _copy_columns(dst_frames, dst_frames_masked)
+    for column in dst_frames_masked:
+        if (column in src_frames.colnames and hasattr(src_frames[column], 'mask') and
+                src_frames[column].mask[src_frames_index].any()):
             #
             # For simplicity, the code below replaces all masked values,
             # but further cuts will restrict to the rows we care about.
             #
             log.info("Replacing masked values in src_frames column %s with zero.", column)
-            src_frames[column][src_frames[column].mask] = 0
-            src_frames[column].mask[src_frames[column].mask] = False
-        if hasattr(dst_frames_patched[column], 'mask') and column != 'TSNR2_ALPHA':
-            if np.any(dst_frames_patched[column].mask[dst_frames_index]):
-                log.info("Patching %d rows in dst_frames column %s.",
-                         np.sum(dst_frames_patched[column].mask[dst_frames_index]), column)
-                src_frames_matched = src_frames[column][src_frames_index]
-                dst_frames_matched = dst_frames_patched[column][dst_frames_index]
-                dst_frames_mask_matched = dst_frames_patched[column].mask[dst_frames_index]
-                assert np.sum(dst_frames_mask_matched) == np.sum(dst_frames_patched[column].mask[dst_frames_index])
-                dst_frames_matched[dst_frames_mask_matched] = src_frames_matched[dst_frames_mask_matched]
-                dst_frames_matched.mask[dst_frames_mask_matched] = False
-                dst_frames_patched[column][dst_frames_index] = dst_frames_matched
-                dst_frames_patched[column].mask[dst_frames_index] = dst_frames_matched.mask
+            src_frames.replace_column(column, src_frames[column].filled(0))
+        if column != 'TSNR2_ALPHA':
+            dst_frames_mask_matched = dst_frames_patched[column].mask[dst_frames_index]
+            n_patch = dst_frames_mask_matched.sum()
+            if n_patch > 0:
+                log.info("Patching %d rows in dst_frames column %s.", n_patch, column)
+                _patch_column(dst_frames_patched[column], src_frames[column],
+                              dst_frames_index, src_frames_index, dst_frames_mask_matched)
                 #
                 # Some values should have changed!
                 #
-                assert not (dst_frames_patched[column].data.data == dst_frames[column].data.data).all()
+                assert not np.array_equal(dst_frames_patched[column].data.data, dst_frames[column].data.data)
     dst_frames_patched = zero_fill(dst_frames_patched, 'frames')
     return dst_frames_patched
 
@@ -144,21 +337,34 @@ def patch_exposures(src_exposures, dst_exposures, first_night=None):
     -------
     :class:`~astropy.table.Table`
         A *copy* of `dst_exposures` with data replaced from `src_exposures`.
+        Columns that cannot be patched share memory with `dst_exposures`.
     """
     log = get_logger()
     if first_night is None:
         first_src_exposure = src_exposures['EXPID'].min()
         first_night = src_exposures['NIGHT'][src_exposures['EXPID'] == first_src_exposure].min()
     #
-    # Set up a join.
+    # Set up a join. The match must be one-to-one.
     #
+    assert len(np.unique(src_exposures['EXPID'])) == len(src_exposures)
+    assert len(np.unique(dst_exposures['EXPID'])) == len(dst_exposures)
     src_exposures_index, dst_exposures_index = match_rows(src_exposures['EXPID'], dst_exposures['EXPID'])
     dst_exposures_bad_coord = ((dst_exposures['TILERA'][dst_exposures_index] == 0) &
                                (dst_exposures['TILEDEC'][dst_exposures_index] == 0))
     #
+    # Rows that need patching in columns that are not masked.
+    #
+    dst_exposures_need_patch = {'TILERA': dst_exposures_bad_coord,
+                                'TILEDEC': dst_exposures_bad_coord,
+                                'MJD': dst_exposures['MJD'][dst_exposures_index] < 50000,
+                                'SURVEY': _not_in(dst_exposures['SURVEY'][dst_exposures_index], _valid_surveys)}
+    #
     # Apply patches from src_exposures.
     #
-    dst_exposures_patched = dst_exposures.copy()
+    dst_exposures_masked = {c for c in dst_exposures.colnames if hasattr(dst_exposures[c], 'mask')}
+    dst_exposures_patched = _copy_columns(dst_exposures, [c for c in dst_exposures.colnames
+                                                          if c in dst_exposures_masked or
+                                                          c in ('TILERA', 'TILEDEC', 'MJD', 'SURVEY')])
     can_patch = ('NIGHT', 'EXPID', 'TILEID', 'TILERA', 'TILEDEC', 'MJD',
                  'SURVEY', 'PROGRAM', 'FAPRGRM', 'FAFLAVOR', 'EXPTIME',
                  'GOALTIME', 'GOALTYPE', 'MINTFRAC', 'AIRMASS', 'EBV',
@@ -168,59 +374,42 @@ def patch_exposures(src_exposures, dst_exposures, first_night=None):
                  'SKY_MAG_AB_GFA', 'EFFTIME_GFA', 'EFFTIME_DARK_GFA',
                  'EFFTIME_BRIGHT_GFA', 'EFFTIME_BACKUP_GFA')
     for column in ['TILERA', 'TILEDEC', 'MJD', 'SURVEY'] + [c for c in dst_exposures_patched.colnames
-                                                            if hasattr(dst_exposures_patched[c], 'mask') and c in can_patch]:
-        if (column in src_exposures.colnames and hasattr(src_exposures[column], 'mask') and np.any(src_exposures[column].mask[src_exposures_index])):
+                                                            if c in dst_exposures_masked and c in can_patch]:
+        if (column in src_exposures.colnames and hasattr(src_exposures[column], 'mask') and
+                src_exposures[column].mask[src_exposures_index].any()):
             #
             # For simplicity, the code below replaces all masked values,
             # but further cuts will restrict to the rows we care about.
             #
             log.info("Replacing masked values in src_exposures column %s with zero.", column)
-            src_exposures[column][src_exposures[column].mask] = 0
-            src_exposures[column].mask[src_exposures[column].mask] = False
+            src_exposures.replace_column(column, src_exposures[column].filled(0))
         #
         # Some columns may not be masked, but we want to copy values from src_exposures anyway.
         #
-        src_exposures_matched = src_exposures[column][src_exposures_index]
-        dst_exposures_matched = dst_exposures_patched[column][dst_exposures_index]
-        dst_exposures_mask_matched = np.zeros((len(dst_exposures_matched), ), dtype=bool)
-        if hasattr(dst_exposures_patched[column], 'mask'):
-            if np.any(dst_exposures_patched[column].mask[dst_exposures_index]):
-                dst_exposures_mask_matched = dst_exposures_patched[column].mask[dst_exposures_index]
+        if column in dst_exposures_masked:
+            dst_exposures_mask_matched = dst_exposures_patched[column].mask[dst_exposures_index]
         else:
-            if column == 'TILERA' or column == 'TILEDEC':
-                dst_exposures_mask_matched = dst_exposures_bad_coord
-            elif column == 'MJD':
-                dst_exposures_mask_matched = (dst_exposures_patched['MJD'][dst_exposures_index] < 50000)
-            else:
-                assert column == 'SURVEY'
-                dst_exposures_mask_matched = ((dst_exposures_patched['SURVEY'][dst_exposures_index] != 'cmx') &
-                                              (dst_exposures_patched['SURVEY'][dst_exposures_index] != 'sv1') &
-                                              (dst_exposures_patched['SURVEY'][dst_exposures_index] != 'sv2') &
-                                              (dst_exposures_patched['SURVEY'][dst_exposures_index] != 'sv3') &
-                                              (dst_exposures_patched['SURVEY'][dst_exposures_index] != 'main') &
-                                              (dst_exposures_patched['SURVEY'][dst_exposures_index] != 'special'))
-        if np.any(dst_exposures_mask_matched):
-            log.info("Patching %d rows in dst_exposures column %s.",
-                     np.sum(dst_exposures_mask_matched), column)
-            dst_exposures_matched[dst_exposures_mask_matched] = src_exposures_matched[dst_exposures_mask_matched]
-            dst_exposures_patched[column][dst_exposures_index] = dst_exposures_matched
-            if hasattr(dst_exposures_patched[column], 'mask'):
-                dst_exposures_matched.mask[dst_exposures_mask_matched] = False
-                dst_exposures_patched[column].mask[dst_exposures_index] = dst_exposures_matched.mask
+            dst_exposures_mask_matched = dst_exposures_need_patch[column]
+        n_patch = dst_exposures_mask_matched.sum()
+        if n_patch > 0:
+            log.info("Patching %d rows in dst_exposures column %s.", n_patch, column)
+            _patch_column(dst_exposures_patched[column], src_exposures[column],
+                          dst_exposures_index, src_exposures_index, dst_exposures_mask_matched)
+            if column in dst_exposures_masked:
                 #
                 # Some values should have changed!
                 #
-                assert not (dst_exposures_patched[column].data.data == dst_exposures[column].data.data).all()
+                assert not np.array_equal(dst_exposures_patched[column].data.data, dst_exposures[column].data.data)
     #
     # QA checks.
     #
-    assert not (dst_exposures_patched['TILERA'] == dst_exposures['TILERA']).all()
-    assert not (dst_exposures_patched['TILEDEC'] == dst_exposures['TILEDEC']).all()
-    assert not (dst_exposures_patched['MJD'] == dst_exposures['MJD']).all()
-    assert not (dst_exposures_patched['SURVEY'] == dst_exposures['SURVEY']).all()
-    assert (dst_exposures_patched['PROGRAM'] == dst_exposures['PROGRAM']).all()
-    assert (dst_exposures_patched['FAPRGRM'] == dst_exposures['FAPRGRM']).all()
-    assert (dst_exposures_patched['FAFLAVOR'] == dst_exposures['FAFLAVOR']).all()
+    assert not np.array_equal(dst_exposures_patched['TILERA'], dst_exposures['TILERA'])
+    assert not np.array_equal(dst_exposures_patched['TILEDEC'], dst_exposures['TILEDEC'])
+    assert not np.array_equal(dst_exposures_patched['MJD'], dst_exposures['MJD'])
+    assert not np.array_equal(dst_exposures_patched['SURVEY'], dst_exposures['SURVEY'])
+    assert np.array_equal(dst_exposures_patched['PROGRAM'], dst_exposures['PROGRAM'])
+    assert np.array_equal(dst_exposures_patched['FAPRGRM'], dst_exposures['FAPRGRM'])
+    assert np.array_equal(dst_exposures_patched['FAFLAVOR'], dst_exposures['FAFLAVOR'])
     #
     # Patch missing MJD.
     #
@@ -229,27 +418,40 @@ def patch_exposures(src_exposures, dst_exposures, first_night=None):
     # we know that we *can* obtain MJD from the raw data headers.
     # Outside of that range, that is not necessarily the case.
     #
-    missing_mjd = ((dst_exposures_patched['MJD'] < 50000) &
-                   (dst_exposures_patched['EFFTIME_SPEC'] > 0) &
-                   (dst_exposures_patched['NIGHT'] >= first_night))
-    for row in dst_exposures_patched[missing_mjd]:
-        raw_data_file = os.path.join(os.environ['DESI_SPECTRO_DATA'],
-                                     "{0:08d}".format(row['NIGHT']),
-                                     "{0:08d}".format(row['EXPID']),
-                                     "desi-{0:08d}.fits.fz".format(row['EXPID']))
-        try:
-            with fits.open(raw_data_file, mode='readonly') as hdulist:
-                mjd_obs = hdulist['SPEC'].header['MJD-OBS']
-            log.info("Tile %d exposure %d has MJD-OBS = %f in %s.", row['TILEID'], row['EXPID'], mjd_obs, raw_data_file)
-            w = np.where(dst_exposures_patched['EXPID'] == row['EXPID'])[0]
-            assert len(w) == 1
-            dst_exposures_patched['MJD'][w] = mjd_obs
-        except FileNotFoundError:
+    missing_mjd = np.flatnonzero((dst_exposures_patched['MJD'] < 50000) &
+                                 (dst_exposures_patched['EFFTIME_SPEC'] > 0) &
+                                 (dst_exposures_patched['NIGHT'] >= first_night))
+    raw_data_files = [os.path.join(os.environ['DESI_SPECTRO_DATA'],
+                                   "{0:08d}".format(night),
+                                   "{0:08d}".format(expid),
+                                   "desi-{0:08d}.fits.fz".format(expid))
+                      for night, expid in zip(dst_exposures_patched['NIGHT'][missing_mjd].tolist(),
+                                              dst_exposures_patched['EXPID'][missing_mjd].tolist())]
+    #
+    # Reading headers is I/O-bound, so read them in parallel.
+    #
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        raw_mjd_obs = list(executor.map(_read_mjd_obs, raw_data_files))
+    for k, raw_data_file, mjd_obs in zip(missing_mjd, raw_data_files, raw_mjd_obs):
+        if mjd_obs is None:
             log.error("%s not found, skipping patch!", raw_data_file)
+        else:
+            log.info("Tile %d exposure %d has MJD-OBS = %f in %s.",
+                     dst_exposures_patched['TILEID'][k], dst_exposures_patched['EXPID'][k],
+                     mjd_obs, raw_data_file)
+            dst_exposures_patched['MJD'][k] = mjd_obs
     #
     # Fill any remaining masked values with zero.
     #
     dst_exposures_patched = zero_fill(dst_exposures_patched, 'exposures')
+    #
+    # Nothing should be masked at this point, so convert to ordinary columns,
+    # which are faster to write.
+    #
+    for column in dst_exposures_patched.colnames:
+        if (isinstance(dst_exposures_patched[column], MaskedColumn) and
+                not dst_exposures_patched[column].mask.any()):
+            dst_exposures_patched.replace_column(column, dst_exposures_patched[column].filled())
     return dst_exposures_patched
 
 
@@ -266,20 +468,23 @@ def patch_missing_frames_mjd(exposures, frames):
     Returns
     -------
     :class:`~astropy.table.Table`
-        An updated version of `frames`.
+        An updated version of `frames`. The ``MJD`` column is replaced
+        with a copy before it is modified.
     """
     log = get_logger()
     exposures_index, frames_index = match_rows(exposures['EXPID'], frames['EXPID'])
     exposures_mjd_matched = exposures['MJD'][exposures_index]
     frames_mjd_matched = frames['MJD'][frames_index]
     frames_missing_mjd = (exposures_mjd_matched != frames_mjd_matched) & (frames_mjd_matched < 50000)
-    log.info("Patching %d frames with MJD == 0 from exposures.", np.sum(frames_missing_mjd))
-    frames_mjd_matched[frames_missing_mjd] = exposures_mjd_matched[frames_missing_mjd]
+    log.info("Patching %d frames with MJD == 0 from exposures.", frames_missing_mjd.sum())
+    _own_column(frames, 'MJD')
+    np.putmask(frames_mjd_matched, frames_missing_mjd, exposures_mjd_matched)
     frames['MJD'][frames_index] = frames_mjd_matched
-    assert (np.sum(frames['MJD'][frames_index] < 50000) ==
-            np.sum((frames['MJD'][frames_index] < 50000) & (exposures['MJD'][exposures_index] < 50000)))
+    frames_still_missing_mjd = frames_mjd_matched < 50000
+    assert (frames_still_missing_mjd.sum() ==
+            (frames_still_missing_mjd & (exposures_mjd_matched < 50000)).sum())
     log.warning("%d frames still have MJD == 0 because the corresponding exposures still have MJD == 0.",
-                np.sum(frames['MJD'] < 50000))
+                (frames['MJD'] < 50000).sum())
     return frames
 
 
@@ -299,58 +504,54 @@ def patch_tiles(src_tiles, dst_tiles, timestamp):
     -------
     :class:`~astropy.table.Table`
         A *copy* of `dst_tiles` with data replaced from `src_tiles`.
+        Columns that cannot be patched share memory with `dst_tiles`.
     """
     log = get_logger()
-    assert (np.unique(src_tiles['TILEID']) == sorted(src_tiles['TILEID'])).all()
-    assert (np.unique(dst_tiles['TILEID']) == sorted(dst_tiles['TILEID'])).all()
+    assert len(np.unique(src_tiles['TILEID'])) == len(src_tiles)
+    assert len(np.unique(dst_tiles['TILEID'])) == len(dst_tiles)
     #
     # Patch TILERA, TILEDEC and other columns.
     #
     src_tiles_index, dst_tiles_index = match_rows(src_tiles['TILEID'], dst_tiles['TILEID'])
     dst_tiles_radec_matched = ((dst_tiles['TILERA'][dst_tiles_index] == 0) &
                                (dst_tiles['TILEDEC'][dst_tiles_index] == 0))
-    dst_tiles_patched = dst_tiles.copy()
+    dst_tiles_patched = _copy_columns(dst_tiles, [c for c in dst_tiles.colnames
+                                                  if dst_tiles[c].dtype.kind == 'f' or
+                                                  c in ('TILERA', 'TILEDEC', 'SURVEY', 'FAPRGRM', 'FAFLAVOR',
+                                                        'OBSSTATUS', 'GOALTYPE', 'EFFTIME_SPEC')])
     for column in dst_tiles_patched.colnames:
-        src_tiles_matched = src_tiles[column][src_tiles_index]
-        dst_tiles_matched = dst_tiles_patched[column][dst_tiles_index]
         if column == 'TILERA' or column == 'TILEDEC':
-            if np.any(dst_tiles_radec_matched):
+            if dst_tiles_radec_matched.any():
                 log.info("Patching %d rows in dst_tiles column %s.",
-                         np.sum(dst_tiles_radec_matched), column)
-                dst_tiles_matched[dst_tiles_radec_matched] = src_tiles_matched[dst_tiles_radec_matched]
-                dst_tiles_patched[column][dst_tiles_index] = dst_tiles_matched
-                assert not (dst_tiles_patched[column] == dst_tiles[column]).all()
+                         dst_tiles_radec_matched.sum(), column)
+                _patch_column(dst_tiles_patched[column], src_tiles[column],
+                              dst_tiles_index, src_tiles_index, dst_tiles_radec_matched)
+                assert not np.array_equal(dst_tiles_patched[column], dst_tiles[column])
         elif column in ('FAPRGRM', 'FAFLAVOR', 'OBSSTATUS', 'GOALTYPE'):
             dst_tiles_unknown_matched = dst_tiles_patched[column][dst_tiles_index] == 'unknown'
-            if np.any(dst_tiles_unknown_matched):
+            if dst_tiles_unknown_matched.any():
                 log.info("Patching %d rows in dst_tiles column %s.",
-                         np.sum(dst_tiles_unknown_matched), column)
-                dst_tiles_matched[dst_tiles_unknown_matched] = src_tiles_matched[dst_tiles_unknown_matched]
-                dst_tiles_patched[column][dst_tiles_index] = dst_tiles_matched
-                assert not (dst_tiles_patched[column] == dst_tiles[column]).all()
+                         dst_tiles_unknown_matched.sum(), column)
+                _patch_column(dst_tiles_patched[column], src_tiles[column],
+                              dst_tiles_index, src_tiles_index, dst_tiles_unknown_matched)
+                assert not np.array_equal(dst_tiles_patched[column], dst_tiles[column])
         else:
             if dst_tiles_patched[column].dtype.kind == 'f':
                 dst_tiles_nan_matched = ~np.isfinite(dst_tiles_patched[column][dst_tiles_index])
-                if np.any(dst_tiles_nan_matched):
+                if dst_tiles_nan_matched.any():
                     log.info("Patching %d rows in dst_tiles column %s.",
-                             np.sum(dst_tiles_nan_matched), column)
-                    dst_tiles_matched[dst_tiles_nan_matched] = src_tiles_matched[dst_tiles_nan_matched]
-                    dst_tiles_patched[column][dst_tiles_index] = dst_tiles_matched
-                    assert not (dst_tiles_patched[column] == dst_tiles[column]).all()
-    #
-    # Patch SURVEY and PROGRAM.
-    #
-    dst_tiles_patched['PROGRAM'] = faflavor2program(dst_tiles_patched['FAFLAVOR'])
-    oddball_survey = np.where((dst_tiles_patched['SURVEY'] != 'cmx') &
-                              (dst_tiles_patched['SURVEY'] != 'sv1') &
-                              (dst_tiles_patched['SURVEY'] != 'sv2') &
-                              (dst_tiles_patched['SURVEY'] != 'sv3') &
-                              (dst_tiles_patched['SURVEY'] != 'main') &
-                              (dst_tiles_patched['SURVEY'] != 'special'))[0]
-    oddball_program = np.where((dst_tiles_patched['PROGRAM'] != 'backup') &
-                               (dst_tiles_patched['PROGRAM'] != 'bright') &
-                               (dst_tiles_patched['PROGRAM'] != 'dark') &
-                               (dst_tiles_patched['PROGRAM'] != 'other'))[0]
+                             dst_tiles_nan_matched.sum(), column)
+                    _patch_column(dst_tiles_patched[column], src_tiles[column],
+                                  dst_tiles_index, src_tiles_index, dst_tiles_nan_matched)
+                    assert not np.array_equal(dst_tiles_patched[column], dst_tiles[column])
+    #
+    # Patch SURVEY and PROGRAM. There are only a few distinct values of
+    # FAFLAVOR, so only map those.
+    #
+    faflavor, faflavor_index = np.unique(np.asarray(dst_tiles_patched['FAFLAVOR']), return_inverse=True)
+    dst_tiles_patched['PROGRAM'] = faflavor2program(faflavor)[faflavor_index]
+    oddball_survey = np.where(_not_in(dst_tiles_patched['SURVEY'], _valid_surveys))[0]
+    oddball_program = np.where(_not_in(dst_tiles_patched['PROGRAM'], _valid_programs))[0]
     assert (dst_tiles_patched['SURVEY'][oddball_survey] == 'unknown').all()
     assert len(oddball_program) == 0
     dst_tiles_patched['SURVEY'][oddball_survey] = 'cmx'
@@ -393,11 +594,13 @@ def back_patch_inconsistent_values(patched):
     :class:`tuple`
         A tuple containing the back-patched exposures and frames tables.
         Not strictly necessary as this function will modify the tables in
-        `patched` in-place.
+        `patched` in-place. Modified columns are replaced with copies first,
+        so tables that share memory with `patched` are not changed.
     """
     log = get_logger()
     back_patch = {'tiles': 'exposures', 'exposures': 'frames'}
     for s, d in back_patch.items():
+        owned = set()
         for row in patched[s]:
             key = 'TILEID' if s == 'tiles' else 'EXPID'
             w = np.where(patched[d][key] == row[key])[0]
@@ -407,6 +610,9 @@ def back_patch_inconsistent_values(patched):
                         log.info("Patching %s associated with %s %d with %s = '%s'.",
                                  d, ('tile' if s == 'tiles' else 'exposure'), row[key],
                                  column, row[column])
+                        if column not in owned:
+                            _own_column(patched[d], column)
+                            owned.add(column)
                         patched[d][column][w] = row[column]
     #
     # Run a QA step.
@@ -438,9 +644,10 @@ def patch_exposures_efftime_spec(src_exposures, dst_exposures, dst_tiles):
     -------
     :class:`~astropy.table.Table`
         A *copy* of `dst_exposures` with data replaced from `src_exposures`.
+        Columns that cannot be patched share memory with `dst_exposures`.
     """
     log = get_logger()
-    dst_exposures_patched = dst_exposures.copy()
+    dst_exposures_patched = _copy_columns(dst_exposures, ['EFFTIME_SPEC'])
     candidate_tiles = dst_tiles[(dst_tiles['LASTNIGHT'] >= 20201214) &
                                 (dst_tiles['EFFTIME_SPEC'] > 0)]
     for t in candidate_tiles:
@@ -484,25 +691,36 @@ def get_data(options):
         A tuple containing two dictionaries, each containing three
         :class:`~astropy.table.Table` objects, plus some metadata.
     """
-    src_tiles_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], options.src,
-                                  f'tiles-{options.src}.csv')
-    src_exposures_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], options.src,
-                                      f'exposures-{options.src}.fits')
-    dst_tiles_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], options.dst,
-                                  f'tiles-{options.dst}.csv')
-    dst_exposures_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], options.dst,
-                                      f'exposures-{options.dst}.fits')
-    src = {'tiles': Table.read(src_tiles_file, format='ascii.csv'),
-           'tiles_file': src_tiles_file,
-           'exposures': Table.read(src_exposures_file, format='fits', hdu='EXPOSURES'),
-           'frames': Table.read(src_exposures_file, format='fits', hdu='FRAMES'),
-           'exposures_file': src_exposures_file}
-    dst = {'tiles': Table.read(dst_tiles_file, format='ascii.csv'),
-           'tiles_file': dst_tiles_file,
-           'exposures': Table.read(dst_exposures_file, format='fits', hdu='EXPOSURES'),
-           'frames': Table.read(dst_exposures_file, format='fits', hdu='FRAMES'),
-           'exposures_file': dst_exposures_file}
-    return (src, dst)
+    return (_read_specprod(options.src), _read_specprod(options.dst))
+
+
+def _read_specprod(specprod):
+    """Read the tiles and exposures summary files for `specprod`.
+
+    Parameters
+    ----------
+    specprod : :class:`str`
+        The name of a specprod.
+
+    Returns
+    -------
+    :class:`dict`
+        A dictionary containing three :class:`~astropy.table.Table` objects,
+        plus the names of the files they were read from.
+    """
+    tiles_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], specprod, f'tiles-{specprod}.csv')
+    exposures_file = os.path.join(os.environ['DESI_SPECTRO_REDUX'], specprod, f'exposures-{specprod}.fits')
+    #
+    # Open the exposures file once for both HDUs.
+    #
+    with fits.open(exposures_file, memmap=False, character_as_bytes=True) as hdulist:
+        exposures = Table.read(hdulist, format='fits', hdu='EXPOSURES')
+        frames = Table.read(hdulist, format='fits', hdu='FRAMES')
+    return {'tiles': Table.read(tiles_file, format='ascii.csv', guess=False),
+            'tiles_file': tiles_file,
+            'exposures': exposures,
+            'frames': frames,
+            'exposures_file': exposures_file}
 
 
 def get_options():
@@ -593,9 +811,15 @@ def main():
                            format='ascii.csv', overwrite=options.overwrite)
     patched['exposures'].write(patched['exposures_file'].replace('.fits', '.csv'),
                                format='ascii.csv', overwrite=options.overwrite)
+    #
+    # Keep string columns as bytes to avoid converting them back and forth
+    # from unicode. Write to a temporary file so that an existing file is
+    # only replaced by a complete file.
+    #
     patched_exposures_hdulist = fits.HDUList([fits.PrimaryHDU(),
-                                              fits.table_to_hdu(patched['exposures']),
-                                              fits.table_to_hdu(patched['frames'])])
-    patched_exposures_hdulist.writeto(patched['exposures_file'],
-                                      overwrite=options.overwrite)
+                                              fits.table_to_hdu(patched['exposures'], character_as_bytes=True),
+                                              fits.table_to_hdu(patched['frames'], character_as_bytes=True)])
+    patched_exposures_tmp = patched['exposures_file'] + '.tmp'
+    patched_exposures_hdulist.writeto(patched_exposures_tmp, overwrite=True)
+    os.replace(patched_exposures_tmp, patched['exposures_file'])
     return 0
@@ -4,61 +4,71 @@
 """
 import os
 import unittest
-from unittest.mock import patch, mock_open, call
+from contextlib import nullcontext
+from functools import lru_cache
+from io import StringIO
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch
 from ..batch import get_options, prepare_template, write_scripts
 from .. import __version__ as specprod_db_version
 
 
-class TestBatch(unittest.TestCase):
-    """Test specprodDB.batch.
-    """
-    @classmethod
-    def setUpClass(cls):
-        cls.maxDiff = None
+def _options(**kwargs):
+    """Create options equivalent to those returned by
+    :func:`~specprodDB.batch.get_options`, without parsing the command line.
 
-    @classmethod
-    def tearDownClass(cls):
-        pass
+    Parameters
+    ----------
+    kwargs : :class:`dict`
+        Override the default value of any option.
 
-    def setUp(self):
-        pass
+    Returns
+    -------
+    :class:`types.SimpleNamespace`
+        An object with the same attributes as the parsed options.
+    """
+    options = {'csh': False,
+               'constraint': 'cpu',
+               'exposures_file': None,
+               'job_dir': '/home/test/Documents/Jobs',
+               'patch_tiles': False,
+               'qos': 'regular',
+               'schema': '${SPECPROD}',
+               'tiles_file': None,
+               'specprod_version': None,
+               'email': 'foo@example.com',
+               'root': '/global/cfs/cdirs/desi',
+               'specprod': 'fuji'}
+    options.update(kwargs)
+    return SimpleNamespace(**options)
 
-    def tearDown(self):
-        pass
 
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--csh', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_get_options(self):
-        """Test option parser.
-        """
-        options = get_options()
-        self.assertTrue(options.csh)
-        self.assertEqual(options.root, '/global/cfs/cdirs/desi')
-        self.assertEqual(options.specprod, 'fuji')
+@lru_cache(maxsize=None)
+def _render(**kwargs):
+    """Convert options to scripts, caching the result.
 
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--csh', '--schema', 'fuji_test', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_prepare_template_csh(self):
-        """Test conversion of options to scripts with csh.
-        """
-        with patch.dict('os.environ', {'DESI_ROOT': '/global/cfs/cdirs/desi', 'DESI_TARGET': '/global/cfs/cdirs/desi/target'}):
-            options = get_options()
-            scripts = prepare_template(options)
-        self.assertIn('load_specprod_db_fuji_test_exposures.csh', scripts)
+    Parameters
+    ----------
+    kwargs : :class:`dict`
+        Override the default value of any option, see :func:`_options`.
 
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--schema', 'fuji_test', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_prepare_template_bash(self):
-        """Test conversion of options to scripts with bash.
-        """
-        with patch.dict('os.environ', {'DESI_ROOT': '/global/cfs/cdirs/desi', 'DESI_TARGET': '/global/cfs/cdirs/desi/target'}):
-            options = get_options()
-            scripts = prepare_template(options)
-        self.assertIn('load_specprod_db_fuji_test_exposures.sh', scripts)
-        self.assertIn('module swap', scripts['load_specprod_db_fuji_test_exposures.sh'])
+    Returns
+    -------
+    :class:`types.MappingProxyType`
+        A read-only view of the scripts.
+    """
+    return MappingProxyType(prepare_template(_options(**kwargs)))
 
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--qos', 'bigmem', '--constraint', 'haswell', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_prepare_template_bash_qos(self):
-        """Test conversion of options to scripts with bash and alternate qos/constraint.
-        """
-        expected = f"""#!/bin/bash
+
+class TestBatch(unittest.TestCase):
+    """Test specprodDB.batch.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        cls.bash_expected = (({'qos': 'bigmem', 'constraint': 'haswell'},
+                              'load_specprod_db_fuji_exposures.sh',
+                              f"""#!/bin/bash
 #SBATCH --qos=bigmem
 #SBATCH --constraint=haswell
 #SBATCH --nodes=1
@@ -77,18 +87,11 @@ srun --ntasks=1 load_specprod_db --overwrite \\
 load_status=$?
 [[ ${{load_status}} == 0 ]] && /bin/mv -v /home/test/Documents/Jobs/load_specprod_db_fuji_exposures.sh /home/test/Documents/Jobs/done
 exit ${{load_status}}
-"""
-        with patch('os.environ', {'HOME': '/home/test'}):
-            options = get_options()
-            scripts = prepare_template(options)
-        self.assertIn('load_specprod_db_fuji_exposures.sh', scripts)
-        self.assertEqual(scripts['load_specprod_db_fuji_exposures.sh'], expected)
-
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--schema', 'fuji_test', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_prepare_template_bash_schema(self):
-        """Test conversion of options to scripts with bash and alternate schema name.
-        """
-        expected = f"""#!/bin/bash
+"""),
+                             # Alternate schema name.
+                             ({'schema': 'fuji_test'},
+                              'load_specprod_db_fuji_test_photometry.sh',
+                              f"""#!/bin/bash
 #SBATCH --qos=regular
 #SBATCH --constraint=cpu
 #SBATCH --nodes=1
@@ -107,18 +110,11 @@ srun --ntasks=1 load_specprod_db  \\
 load_status=$?
 [[ ${{load_status}} == 0 ]] && /bin/mv -v /home/test/Documents/Jobs/load_specprod_db_fuji_test_photometry.sh /home/test/Documents/Jobs/done
 exit ${{load_status}}
-"""
-        with patch('os.environ', {'HOME': '/home/test'}):
-            options = get_options()
-            scripts = prepare_template(options)
-        self.assertIn('load_specprod_db_fuji_test_photometry.sh', scripts)
-        self.assertEqual(scripts['load_specprod_db_fuji_test_photometry.sh'], expected)
-
-    @patch('sys.argv', ['prepare_batch_specprod_db', '--specprod-version', 'main', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
-    def test_prepare_template_bash_version(self):
-        """Test conversion of options to scripts with bash and alternate version name.
-        """
-        expected = f"""#!/bin/bash
+"""),
+                             # Alternate version name.
+                             ({'specprod_version': 'main'},
+                              'load_specprod_db_fuji_photometry.sh',
+                              f"""#!/bin/bash
 #SBATCH --qos=regular
 #SBATCH --constraint=cpu
 #SBATCH --nodes=1
@@ -137,12 +133,53 @@ srun --ntasks=1 load_specprod_db  \\
 load_status=$?
 [[ ${{load_status}} == 0 ]] && /bin/mv -v /home/test/Documents/Jobs/load_specprod_db_fuji_photometry.sh /home/test/Documents/Jobs/done
 exit ${{load_status}}
-"""
+"""))
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    @patch('sys.argv', ['prepare_batch_specprod_db', '--csh', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
+    def test_get_options(self):
+        """Test option parser.
+        """
         with patch('os.environ', {'HOME': '/home/test'}):
             options = get_options()
-            scripts = prepare_template(options)
-        self.assertIn('load_specprod_db_fuji_photometry.sh', scripts)
-        self.assertEqual(scripts['load_specprod_db_fuji_photometry.sh'], expected)
+        self.assertTrue(options.csh)
+        self.assertEqual(options.root, '/global/cfs/cdirs/desi')
+        self.assertEqual(options.specprod, 'fuji')
+        #
+        # The options used by the other tests should match the parser.
+        #
+        self.assertEqual(vars(options), vars(_options(csh=True)))
+
+    def test_prepare_template_csh(self):
+        """Test conversion of options to scripts with csh.
+        """
+        scripts = _render(csh=True, schema='fuji_test')
+        self.assertIn('load_specprod_db_fuji_test_exposures.csh', scripts)
+
+    def test_prepare_template_bash(self):
+        """Test conversion of options to scripts with bash.
+        """
+        scripts = _render(schema='fuji_test')
+        self.assertIn('load_specprod_db_fuji_test_exposures.sh', scripts)
+        self.assertIn('module swap', scripts['load_specprod_db_fuji_test_exposures.sh'])
+
+    def test_prepare_template_bash_expected(self):
+        """Test conversion of options to scripts with bash, comparing to the expected script.
+        """
+        for kwargs, script, expected in self.bash_expected:
+            with self.subTest(**kwargs):
+                scripts = _render(**kwargs)
+                self.assertIn(script, scripts)
+                self.assertEqual(scripts[script], expected)
 
     @patch('sys.argv', ['prepare_batch_specprod_db', '--schema', 'fuji', 'foo@example.com', '/global/cfs/cdirs/desi', 'fuji'])
     def test_write_scripts(self):
@@ -151,17 +188,14 @@ exit ${{load_status}}
         options = get_options()
         # scripts = prepare_template(options)
         scripts = {'foo.sh': 'abcd', 'bar.sh': 'abcd'}
-        m = mock_open()
-        with patch('builtins.open', m) as mm:
-            write_scripts(scripts, options.job_dir)
-        m.assert_has_calls([call(os.path.join(os.environ['HOME'], 'Documents', 'Jobs', 'foo.sh'), 'w'),
-                            call().__enter__(),
-                            call().write('abcd'),
-                            call().__exit__(None, None, None),
-                            call(os.path.join(os.environ['HOME'], 'Documents', 'Jobs', 'bar.sh'), 'w'),
-                            call().__enter__(),
-                            call().write('abcd'),
-                            call().__exit__(None, None, None),
-                            ])
-        handle = m()
-        handle.write.assert_has_calls([call('abcd'), call('abcd')])
+        fs = {}
+
+        def opener(path, mode):
+            self.assertEqual(mode, 'w')
+            fs[path] = StringIO()
+            return nullcontext(fs[path])
+
+        write_scripts(scripts, options.job_dir, opener=opener)
+        self.assertEqual({path: f.getvalue() for path, f in fs.items()},
+                         {os.path.join(os.environ['HOME'], 'Documents', 'Jobs', 'foo.sh'): 'abcd',
+                          os.path.join(os.environ['HOME'], 'Documents', 'Jobs', 'bar.sh'): 'abcd'})
@@ -2,29 +2,27 @@
 # -*- coding: utf-8 -*-
 """Test specprodDB.load.
 """
-import os
 import unittest
 from unittest.mock import patch, call
-from tempfile import mkdtemp
-from shutil import rmtree
-from ..load import load_file, setup_db, q3c_index, get_options
+from importlib.util import find_spec
+import numpy as np
+from astropy.table import Table
+sqlalchemy_available = find_spec('sqlalchemy') is not None
+if sqlalchemy_available:
+    from ..load import Photometry, Potential, q3c_index, get_options
 
 
+@unittest.skipUnless(sqlalchemy_available, "SQLAlchemy is not installed.")
 class TestLoad(unittest.TestCase):
     """Test specprodDB.load
     """
     @classmethod
     def setUpClass(cls):
-        """Create temporary directory.
-        """
-        cls.testDir = mkdtemp()
+        pass
 
     @classmethod
     def tearDownClass(cls):
-        """Clean up temporary directory.
-        """
-        if os.path.exists(cls.testDir):
-            rmtree(cls.testDir)
+        pass
 
     def setUp(self):
         pass
@@ -32,6 +30,45 @@ class TestLoad(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def test_photometry_convert_mappings(self):
+        """Test conversion of Photometry data into dictionaries.
+        """
+        n = 3
+        data = Table()
+        for column in Photometry.__table__.columns:
+            if column.name.startswith('dchisq_'):
+                continue
+            python_type = column.type.python_type
+            if python_type is str:
+                data[column.name.upper()] = np.array(['a', 'b', 'c'])
+            elif python_type is float:
+                data[column.name.upper()] = np.arange(n, dtype=np.float32)
+            elif python_type is bool:
+                data[column.name.upper()] = np.ones((n,), dtype=bool)
+            else:
+                data[column.name.upper()] = np.arange(n, dtype=np.int32)
+        data['DCHISQ'] = np.arange(5*n, dtype=np.float32).reshape(n, 5)
+        row_index = np.array([0, 2])
+        objects = Photometry.convert(data, row_index=row_index)
+        mappings = Photometry.convert(data, row_index=row_index, mappings=True)
+        self.assertEqual(len(mappings), 2)
+        for o, m in zip(objects, mappings):
+            self.assertDictEqual(m, dict([(c.name, getattr(o, c.name)) for c in Photometry.__table__.columns]))
+        self.assertListEqual(Photometry.convert(data, row_index=np.array([], dtype=int), mappings=True), [])
+
+    def test_potential_convert_mappings(self):
+        """Test conversion of Potential data into dictionaries.
+        """
+        data = Table()
+        data['TARGETID'] = np.array([10, 20, 30], dtype=np.int64)
+        data['FIBER'] = np.array([1, 2, 3], dtype=np.int32)
+        data['LOCATION'] = np.array([1001, 1002, 1003], dtype=np.int32)
+        mappings = Potential.convert(data, tileid=100, row_index=np.array([1, 2]), mappings=True)
+        self.assertDictEqual(mappings[0], {'id': (((1002 << 32) | 100) << 64) | 20,
+                                           'tileid': 100, 'targetid': 20, 'fiber': 2, 'location': 1002})
+        objects = Potential.convert(data, tileid=100, row_index=np.array([1, 2]))
+        self.assertEqual(objects[1].id, mappings[1]['id'])
+
     @patch('sys.argv', ['load_specprod_db', '/global/cfs/cdirs/desi'])
     def test_get_options(self):
         """Test parsing of command-line options.
@@ -48,9 +85,14 @@ class TestLoad(unittest.TestCase):
     def test_q3c_index(self, mock_log, mock_session, mock_text):
         """Test creation of q3c index.
         """
-        text = mock_text('CREATE INDEX IF NOT EXISTS ix_target_q3c_ang2ipix ON fuji.target (q3c_ang2ipix(tile_ra, tile_dec));\n    CLUSTER fuji.target USING ix_target_q3c_ang2ipix;\n    ANALYZE fuji.target;\n    ')
+        expected = """CREATE INDEX IF NOT EXISTS ix_target_q3c_ang2ipix ON fuji.target (q3c_ang2ipix(tile_ra, tile_dec));
+        CLUSTER fuji.target USING ix_target_q3c_ang2ipix;
+        ANALYZE fuji.target;"""
         with patch('specprodDB.load.schemaname', 'fuji'):
             q3c_index('target', ra='tile_ra')
-        mock_session.execute.assert_called_once_with(text)
-        mock_log.info.assert_has_calls([call("Creating q3c index on %s.%s.", 'fuji', 'target'),
-                                        call("Finished q3c index on %s.%s.", 'fuji', 'target')])
+        self.assertEqual(mock_text.call_count, 1)
+        self.assertEqual(' '.join(mock_text.call_args.args[0].split()), ' '.join(expected.split()))
+        mock_session.execute.assert_called_once_with(mock_text.return_value)
+        self.assertEqual(mock_log.info.call_args_list,
+                         [call("Creating q3c index on %s.%s.", 'fuji', 'target'),
+                          call("Finished q3c index on %s.%s.", 'fuji', 'target')])
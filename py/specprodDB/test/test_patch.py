@@ -2,10 +2,14 @@
 # -*- coding: utf-8 -*-
 """Test specprodDB.patch.
 """
-import os
 import unittest
-from unittest.mock import patch, mock_open, call
-from ..patch import get_options, get_data
+from unittest.mock import patch
+import numpy as np
+from astropy.table import Table, MaskedColumn
+import datetime
+from ..patch import (get_options, frame_keys, match_rows, _copy_columns, _patch_column, _not_in,
+                     patch_frames, patch_exposures, patch_missing_frames_mjd, patch_tiles,
+                     back_patch_inconsistent_values)
 # from .. import __version__ as specprod_db_version
 
 
@@ -15,6 +19,9 @@ class TestPatch(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         cls.maxDiff = None
+        cls.A = np.arange(5)
+        cls.B = np.arange(5) + 10
+        cls.A_mask = np.array([True, False, False, False, True])
 
     @classmethod
     def tearDownClass(cls):
@@ -36,3 +43,147 @@ class TestPatch(unittest.TestCase):
         self.assertEqual(options.dst, 'daily')
         self.assertEqual(options.output, '.')
         self.assertFalse(options.overwrite)
+
+    def test_frame_keys(self):
+        """Test frame_keys().
+        """
+        frames = {'EXPID': np.array([12345, 54321, 9876543], dtype=np.int32),
+                  'CAMERA': np.array([b'b0', b'r5', b'z9'])}
+        self.assertListEqual(frame_keys(frames).tolist(), [1234500, 5432115, 987654329])
+
+    def test_match_rows(self):
+        """Test match_rows().
+        """
+        left = np.array([5, 3, 9, 1])
+        right = np.array([1, 2, 3, 4, 5, 6])
+        left_index, right_index = match_rows(left, right)
+        self.assertListEqual(left[left_index].tolist(), right[right_index].tolist())
+        self.assertListEqual(sorted(left_index.tolist()), [0, 1, 3])
+        #
+        # Non-unique right.
+        #
+        right = np.array([3, 3, 5, 7, 3])
+        left_index, right_index = match_rows(left, right)
+        self.assertListEqual(left[left_index].tolist(), right[right_index].tolist())
+        self.assertListEqual(sorted(right_index.tolist()), [0, 1, 2, 4])
+        #
+        # Non-unique, but smaller, left.
+        #
+        left_index, right_index = match_rows(np.array([3, 3, 11]), np.arange(10))
+        self.assertListEqual(left_index.tolist(), [0, 1])
+        self.assertListEqual(right_index.tolist(), [3, 3])
+        #
+        # Neither side is unique.
+        #
+        left = np.array([3, 3, 4])
+        left_index, right_index = match_rows(left, right)
+        self.assertListEqual(left[left_index].tolist(), right[right_index].tolist())
+        self.assertEqual(len(left_index), 6)
+        #
+        # Empty input.
+        #
+        left_index, right_index = match_rows(np.array([], dtype=int), right)
+        self.assertEqual(len(left_index), 0)
+        self.assertEqual(len(right_index), 0)
+
+    def test_copy_columns(self):
+        """Test _copy_columns() on copied, shared and masked columns.
+        """
+        data = Table({'A': self.A, 'B': self.B,
+                      'C': MaskedColumn(self.A, mask=self.A_mask, copy=False)}, copy=False)
+        for columns in ([], ['A'], ['A', 'C'], ['A', 'B', 'C']):
+            with self.subTest(columns=columns):
+                copied = _copy_columns(data, columns)
+                self.assertListEqual(copied.colnames, data.colnames)
+                for column in data.colnames:
+                    self.assertTrue(np.array_equal(copied[column], data[column]))
+                    self.assertEqual(np.shares_memory(copied[column], data[column]), column not in columns)
+                self.assertEqual(np.shares_memory(copied['C'].mask, data['C'].mask), 'C' not in columns)
+
+    def test_patch_column(self):
+        """Test _patch_column() on a masked column.
+        """
+        dst = MaskedColumn(np.arange(5), mask=[True, False, True, False, True])
+        src = np.array([10, 11, 12, 13])
+        dst_index = np.array([0, 2, 4])
+        src_index = np.array([3, 1, 0])
+        _patch_column(dst, src, dst_index, src_index, np.array([True, True, False]))
+        self.assertListEqual(dst.data.data.tolist(), [13, 1, 11, 3, 4])
+        self.assertListEqual(dst.mask.tolist(), [False, False, False, False, True])
+
+    def test_not_in(self):
+        """Test _not_in() on both str and bytes columns.
+        """
+        valid = np.array(['cmx', 'main'])
+        self.assertListEqual(_not_in(np.array(['cmx', 'foo', 'main']), valid).tolist(),
+                             [False, True, False])
+        self.assertListEqual(_not_in(np.array([b'cmx', b'foo', b'main']), valid).tolist(),
+                             [False, True, False])
+
+    def test_dst_unchanged(self):
+        """Test that patching does not modify the destination tables.
+        """
+        src_tiles = Table({'TILEID': [1, 2], 'TILERA': [10.0, 20.0], 'TILEDEC': [5.0, 6.0],
+                           'SURVEY': ['main', 'main'], 'PROGRAM': ['dark', 'bright'],
+                           'FAPRGRM': ['dark', 'bright'], 'FAFLAVOR': ['maindark', 'mainbright'],
+                           'OBSSTATUS': ['obsend', 'obsend'], 'GOALTYPE': ['dark', 'bright'],
+                           'EFFTIME_SPEC': [100.0, 200.0]})
+        src_exposures = Table({'NIGHT': [20210101, 20210101, 20210102], 'EXPID': [100, 101, 102],
+                               'TILEID': [1, 1, 2], 'TILERA': [10.0, 10.0, 20.0], 'TILEDEC': [5.0, 5.0, 6.0],
+                               'MJD': [59215.1, 59215.2, 59216.1], 'SURVEY': ['main', 'main', 'main'],
+                               'PROGRAM': ['dark', 'dark', 'bright'], 'FAPRGRM': ['dark', 'dark', 'bright'],
+                               'FAFLAVOR': ['maindark', 'maindark', 'mainbright'],
+                               'GOALTYPE': ['dark', 'dark', 'bright'], 'EFFTIME_SPEC': [100.0, 100.0, 200.0],
+                               'EXPTIME': MaskedColumn([900.0, 900.0, 600.0], mask=[False, False, False])})
+        src_frames = Table({'EXPID': [100, 100, 101, 101], 'CAMERA': ['b0', 'r0', 'b0', 'r0'],
+                            'MJD': [59215.1, 59215.1, 59215.2, 59215.2],
+                            'SURVEY': ['main', 'main', 'main', 'main'],
+                            'PROGRAM': ['dark', 'dark', 'dark', 'dark'],
+                            'EXPTIME': MaskedColumn([900.0, 900.0, 901.0, 901.0], mask=[False]*4)})
+        for table in (src_tiles, src_exposures, src_frames):
+            for column in table.colnames:
+                if table[column].dtype.kind == 'U':
+                    table[column] = table[column].astype('U12')
+        dst_tiles = src_tiles.copy()
+        dst_tiles['TILERA'][1] = 0.0
+        dst_tiles['TILEDEC'][1] = 0.0
+        dst_exposures = src_exposures.copy()
+        dst_exposures['TILERA'][0] = 0.0
+        dst_exposures['TILEDEC'][0] = 0.0
+        dst_exposures['MJD'][1] = 0.0
+        dst_exposures['SURVEY'][2] = 'unknown'
+        dst_exposures['GOALTYPE'][0:2] = 'other'
+        dst_exposures['EXPTIME'][0] = 0.0
+        dst_exposures['EXPTIME'].mask[0] = True
+        dst_frames = src_frames.copy()
+        dst_frames['MJD'][2:] = 0.0
+        dst_frames['PROGRAM'][0] = 'other'
+        dst_frames['EXPTIME'][1] = 0.0
+        dst_frames['EXPTIME'].mask[1] = True
+        dst = {'tiles': dst_tiles, 'exposures': dst_exposures, 'frames': dst_frames}
+        original = {k: v.copy() for k, v in dst.items()}
+        patched = dict()
+        patched['frames'] = patch_frames(src_frames, dst_frames)
+        patched['exposures'] = patch_exposures(src_exposures, dst_exposures)
+        patched['frames'] = patch_missing_frames_mjd(patched['exposures'], patched['frames'])
+        patched['tiles'] = patch_tiles(src_tiles, dst_tiles, datetime.datetime(2024, 1, 1))
+        back_patch_inconsistent_values(patched)
+        self.assertListEqual(patched['exposures']['GOALTYPE'].tolist(), ['dark', 'dark', 'bright'])
+        self.assertListEqual(patched['frames']['PROGRAM'].tolist(), ['dark']*4)
+        self.assertListEqual(patched['frames']['MJD'].tolist(), [59215.1, 59215.1, 59215.2, 59215.2])
+        for table in dst:
+            for column in original[table].colnames:
+                with self.subTest(table=table, column=column):
+                    self.assertTrue(np.array_equal(dst[table][column].data, original[table][column].data))
+                    if hasattr(original[table][column], 'mask'):
+                        self.assertTrue(np.array_equal(dst[table][column].mask, original[table][column].mask))
+
+    def test_patch_exposures_duplicate_expid(self):
+        """Test that patch_exposures() rejects duplicate EXPID.
+        """
+        src_exposures = Table({'NIGHT': [20210101, 20210101], 'EXPID': [100, 101]})
+        dst_exposures = Table({'NIGHT': [20210101, 20210101], 'EXPID': [100, 100]})
+        with self.assertRaises(AssertionError):
+            patch_exposures(src_exposures, dst_exposures)
+        with self.assertRaises(AssertionError):
+            patch_exposures(dst_exposures, src_exposures)
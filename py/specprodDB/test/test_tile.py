@@ -2,12 +2,28 @@
 # -*- coding: utf-8 -*-
 """Test specprodDB.tile.
 """
-# import os
+import os
 import unittest
-from unittest.mock import patch, call
-from ..tile import get_options
+from unittest.mock import patch
+from importlib.util import find_spec
+from tempfile import mkdtemp
+from shutil import rmtree
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+sqlalchemy_available = find_spec('sqlalchemy') is not None
+if sqlalchemy_available:
+    from sqlalchemy import create_engine, event, select
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.orm import Session
+    from ..load import Fiberassign, Photometry, Potential, Tile, Ztile
+    from ..tile import (get_options, potential_targets, potential_photometry,
+                        load_targetphot, load_fiberassign, _loaded_photometry, _bulk_insert,
+                        load_redshift, update_primary, _primary_table, _frame_rows,
+                        _upsert, _bulk_update)
 
 
+@unittest.skipUnless(sqlalchemy_available, "SQLAlchemy is not installed.")
 class TestTile(unittest.TestCase):
     """Test specprodDB.tile
     """
@@ -15,16 +31,14 @@ class TestTile(unittest.TestCase):
     def setUpClass(cls):
         """Create temporary directory.
         """
-        # cls.testDir = mkdtemp()
-        pass
+        cls.testDir = mkdtemp()
 
     @classmethod
     def tearDownClass(cls):
         """Clean up temporary directory.
         """
-        # if os.path.exists(cls.testDir):
-        #     rmtree(cls.testDir)
-        pass
+        if os.path.exists(cls.testDir):
+            rmtree(cls.testDir)
 
     def setUp(self):
         pass
@@ -32,6 +46,83 @@ class TestTile(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def sqlite_session(self, *classes):
+        """Replace the database session with an in-memory SQLite session.
+
+        Parameters
+        ----------
+        classes : :class:`tuple`
+            ORM classes whose tables will be created.
+
+        Returns
+        -------
+        :class:`tuple`
+            The session and a list that records the first word of
+            every SQL statement sent to the database.
+        """
+        engine = create_engine('sqlite://')
+        for cls in classes:
+            cls.__table__.create(engine)
+        statements = []
+        event.listen(engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+        session = Session(engine)
+        patcher = patch('specprodDB.load.dbSession', session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(session.close)
+        return (session, statements)
+
+    @staticmethod
+    def required(cls, **kwargs):
+        """Create a row for `cls`, setting every ``NOT NULL`` column.
+
+        Parameters
+        ----------
+        cls : :class:`type`
+            An ORM class.
+        kwargs : :class:`dict`
+            Values that override the default zero or empty string.
+
+        Returns
+        -------
+        :class:`dict`
+            A row suitable for an ``INSERT``.
+        """
+        row = dict()
+        for column in cls.__table__.columns:
+            if not column.nullable:
+                row[column.name] = '' if column.type.python_type is str else 0
+        row.update(kwargs)
+        return row
+
+    @staticmethod
+    def catalog(cls, n, **kwargs):
+        """Create a catalog with an upper-case column for every column of `cls`.
+
+        Parameters
+        ----------
+        cls : :class:`type`
+            An ORM class.
+        n : :class:`int`
+            Number of rows.
+        kwargs : :class:`dict`
+            Columns that override the default zeros or empty strings.
+
+        Returns
+        -------
+        :class:`~astropy.table.Table`
+            A Table suitable for ``cls.convert()``.
+        """
+        dtype = {bool: bool, int: np.int64, float: np.float64, str: 'U8'}
+        t = Table()
+        for column in cls.__table__.columns:
+            if column.type.python_type in dtype:
+                t[column.name.upper()] = np.zeros((n,), dtype=dtype[column.type.python_type])
+        for column in kwargs:
+            t[column] = kwargs[column]
+        return t
+
     @patch('sys.argv', ['load_specprod_tile', '12345'])
     def test_get_options(self):
         """Test parsing of command-line options.
@@ -41,3 +132,237 @@ class TestTile(unittest.TestCase):
         self.assertFalse(options.verbose)
         self.assertFalse(options.overwrite)
         self.assertEqual(options.tile, 12345)
+
+    @patch('specprodDB.load.dbSession')
+    def test_loaded_photometry(self, mock_session):
+        """Test query for photometry already loaded.
+        """
+        mock_session.scalars.return_value = iter([1, 3])
+        loaded = _loaded_photometry([1, 2, 3, 4, 5])
+        self.assertEqual(loaded.dtype, np.int64)
+        self.assertListEqual(loaded.tolist(), [1, 3])
+        statement = mock_session.scalars.call_args.args[0]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.assertIn('= ANY', str(compiled))
+        self.assertListEqual(compiled.params['targetid'], [1, 2, 3, 4, 5])
+        mock_session.reset_mock()
+        self.assertEqual(len(_loaded_photometry([])), 0)
+        mock_session.scalars.assert_not_called()
+
+    @patch('specprodDB.load.log')
+    @patch('specprodDB.tile.fiberassign_file')
+    def test_potential_targets(self, mock_file, mock_log):
+        """Test reading potential targets, with and without a column subset.
+        """
+        filename = os.path.join(self.testDir, 'fiberassign-012345.fits')
+        targets = Table()
+        targets['TARGETID'] = np.array([1, 2, 2**59 + 3, 4], dtype=np.int64)
+        targets['RA'] = np.array([10.0, 20.0, 30.0, 40.0])
+        targets['DEC'] = np.array([-10.0, -20.0, -30.0, -40.0])
+        targets['PRIORITY'] = np.array([100, 200, 300, 400], dtype=np.int32)
+        targets.meta['EXTNAME'] = 'TARGETS'
+        targets.write(filename, overwrite=True)
+        mock_file.return_value = filename
+        t = potential_targets(12345)
+        self.assertListEqual(t.colnames, ['TARGETID', 'RA', 'DEC', 'PRIORITY'])
+        self.assertListEqual(t['TARGETID'].tolist(), [1, 2, 4])
+        t = potential_targets(12345, columns=['RA', 'DEC'])
+        self.assertListEqual(t.colnames, ['TARGETID', 'RA', 'DEC'])
+        self.assertListEqual(t['TARGETID'].tolist(), [1, 2, 4])
+        self.assertListEqual(t['DEC'].tolist(), [-10.0, -20.0, -40.0])
+        mock_file.assert_called_with(12345)
+
+    def test_bulk_insert(self):
+        """Test executemany insert of row dictionaries.
+        """
+        session, statements = self.sqlite_session(Photometry)
+        _bulk_insert(Photometry, [self.required(Photometry, targetid=k, ls_id=10*k) for k in (1, 2, 3)])
+        self.assertListEqual(statements, ['INSERT'])
+        self.assertFalse(session.in_transaction())
+        rows = session.execute(select(Photometry.targetid, Photometry.ls_id).order_by(Photometry.targetid)).all()
+        self.assertListEqual([tuple(r) for r in rows], [(1, 10), (2, 20), (3, 30)])
+
+    def test_bulk_update(self):
+        """Test grouping of bulk updates by primary key.
+        """
+        session, statements = self.sqlite_session(Ztile)
+        session.execute(Ztile.__table__.insert(),
+                        [self.required(Ztile, id=k, targetphotid=k, targetid=k) for k in range(10)])
+        statements.clear()
+        _bulk_update(Ztile, [{'id': k, 'zcat_nspec': 1, ('sv_nspec' if k % 2 else 'main_nspec'): k}
+                             for k in range(10)])
+        self.assertListEqual(statements, ['UPDATE', 'UPDATE'])
+        rows = session.execute(select(Ztile.targetid, Ztile.zcat_nspec, Ztile.sv_nspec, Ztile.main_nspec)
+                               .order_by(Ztile.targetid)).all()
+        self.assertListEqual([tuple(r) for r in rows],
+                             [(k, 1, k if k % 2 else 0, 0 if k % 2 else k) for k in range(10)])
+
+    @patch('specprodDB.load.log')
+    @patch('specprodDB.tile._loaded_photometry')
+    def test_potential_photometry(self, mock_loaded, mock_log):
+        """Test removal of photometry already loaded.
+        """
+        tile = Tile(tileid=12345, survey='main', program='dark')
+        targets = Table()
+        targets['TARGETID'] = np.array([1, 2, 3, 4], dtype=np.int64)
+        targets['RA'] = np.array([10.0, 20.0, 30.0, 40.0])
+        targets['DEC'] = np.array([-10.0, -20.0, -30.0, -40.0])
+        mock_loaded.return_value = np.array([2, 4], dtype=np.int64)
+        cat = potential_photometry(tile, targets)
+        self.assertListEqual(cat['TARGETID'].tolist(), [1, 3])
+        self.assertListEqual(cat['TARGET_RA'].tolist(), [10.0, 30.0])
+        self.assertListEqual(cat['SURVEY'].tolist(), ['main', 'main'])
+        mock_loaded.assert_called_once_with([1, 2, 3, 4])
+        mock_loaded.reset_mock()
+        cat = potential_photometry(tile, targets, overwrite=True)
+        self.assertListEqual(cat['TARGETID'].tolist(), [1, 2, 3, 4])
+        self.assertListEqual(cat['TILEID'].tolist(), [12345]*4)
+        mock_loaded.assert_not_called()
+
+    @patch('specprodDB.load.log')
+    @patch('specprodDB.tile._loaded_photometry')
+    def test_load_targetphot(self, mock_loaded, mock_log):
+        """Test selection and loading of targeting photometry.
+        """
+        session, statements = self.sqlite_session(Photometry)
+        targetphot = self.catalog(Photometry, 6,
+                                  TARGETID=np.array([5, 1, 2, 5, 3, 4], dtype=np.int64),
+                                  RELEASE=np.array([0, 9010, 0, 0, 0, 0], dtype=np.int16),
+                                  LS_ID=np.arange(6, dtype=np.int64) + 100,
+                                  DCHISQ=np.zeros((6, 5), dtype=np.float32))
+        mock_loaded.return_value = np.array([3], dtype=np.int64)
+        loaded = load_targetphot(targetphot, [{'targetid': 1, 'ls_id': 10}])
+        mock_loaded.assert_called_once_with([5, 2, 3, 4])
+        self.assertListEqual([r['targetid'] for r in loaded], [5, 2, 4])
+        self.assertListEqual(statements, ['INSERT'])
+        rows = session.execute(select(Photometry.targetid, Photometry.ls_id).order_by(Photometry.targetid)).all()
+        self.assertListEqual([tuple(r) for r in rows], [(2, 102), (4, 105), (5, 100)])
+
+    @patch('specprodDB.load.log')
+    @patch('specprodDB.tile.fiberassign_file')
+    def test_load_fiberassign(self, mock_file, mock_log):
+        """Test reading fiberassign and potential assignments from one file.
+        """
+        session, statements = self.sqlite_session(Fiberassign, Potential)
+        filename = os.path.join(self.testDir, 'fiberassign-054321.fits')
+        fiberassign = self.catalog(Fiberassign, 3,
+                                   TARGETID=np.array([1, 2**59 + 2, 3], dtype=np.int64),
+                                   LOCATION=np.array([1001, 1002, 1003], dtype=np.int32))
+        potential = self.catalog(Potential, 4,
+                                 TARGETID=np.array([1, 2**59 + 2, 3, 4], dtype=np.int64),
+                                 LOCATION=np.array([1001, 1002, 1003, 1004], dtype=np.int32))
+        hdulist = fits.HDUList([fits.PrimaryHDU(),
+                                fits.table_to_hdu(fiberassign),
+                                fits.table_to_hdu(potential)])
+        hdulist[1].name = 'FIBERASSIGN'
+        hdulist[2].name = 'POTENTIAL_ASSIGNMENTS'
+        hdulist.writeto(filename, overwrite=True)
+        mock_file.return_value = filename
+        tile = Tile(tileid=54321, survey='main', program='dark')
+        load_fiberassign(tile)
+        mock_file.assert_called_once_with(54321)
+        self.assertListEqual(statements, ['INSERT', 'INSERT'])
+        rows = session.execute(select(Fiberassign.tileid, Fiberassign.targetid, Fiberassign.location)
+                               .order_by(Fiberassign.targetid)).all()
+        self.assertListEqual([tuple(r) for r in rows], [(54321, 1, 1001), (54321, 3, 1003)])
+        rows = session.execute(select(Potential.tileid, Potential.targetid, Potential.location)
+                               .order_by(Potential.targetid)).all()
+        self.assertListEqual([tuple(r) for r in rows], [(54321, 1, 1001), (54321, 3, 1003), (54321, 4, 1004)])
+
+    def test_primary_table(self):
+        """Test conversion of Ztile objects for find_primary_spectra.
+        """
+        ztile = [Ztile(targetid=1, zwarn=0, tsnr2_lrg=10.0),
+                 Ztile(targetid=1, zwarn=4, tsnr2_lrg=20.0),
+                 Ztile(targetid=2, zwarn=0, tsnr2_lrg=5.0)]
+        t = _primary_table(ztile)
+        self.assertListEqual(t.colnames, ['TARGETID', 'ZWARN', 'TSNR2_LRG'])
+        self.assertListEqual(t['TARGETID'].tolist(), [1, 1, 2])
+        self.assertEqual(t['ZWARN'].dtype, np.int64)
+        self.assertListEqual(t['TSNR2_LRG'].tolist(), [10.0, 20.0, 5.0])
+        self.assertEqual(len(_primary_table([])), 0)
+
+    @patch('specprodDB.load.log')
+    def test_update_primary(self, mock_log):
+        """Test bulk update of primary classification.
+        """
+        session, statements = self.sqlite_session(Ztile)
+        update_primary()
+        self.assertListEqual(statements, ['SELECT'])
+        mock_log.info.assert_called_with("No %sZtile objects to update.", 'Main ')
+        surveys = ['sv1', 'main', 'cmx', 'sv3', 'main', 'sv1', 'cmx', 'main']
+        targetids = [1, 1, 1, 2, 2, 2, 3, 3]
+        tsnr2_lrg = [10.0, 20.0, 30.0, 5.0, 1.0, 2.0, 7.0, 8.0]
+        session.execute(Ztile.__table__.insert(),
+                        [self.required(Ztile, id=k, targetphotid=k, targetid=t, tileid=k, survey=s, tsnr2_lrg=l)
+                         for k, (t, s, l) in enumerate(zip(targetids, surveys, tsnr2_lrg))])
+        session.commit()
+        statements.clear()
+        update_primary()
+        #
+        # One UPDATE each for SV, main and other surveys, despite interleaving.
+        #
+        self.assertListEqual(statements, ['SELECT', 'UPDATE', 'UPDATE', 'UPDATE'])
+        rows = session.execute(select(Ztile.zcat_nspec, Ztile.zcat_primary,
+                                      Ztile.sv_nspec, Ztile.sv_primary,
+                                      Ztile.main_nspec, Ztile.main_primary).order_by(Ztile.id)).all()
+        self.assertListEqual([tuple(r) for r in rows],
+                             [(3, False, 1, True, 0, False),
+                              (3, False, 0, False, 1, True),
+                              (3, True, 0, False, 0, False),
+                              (3, True, 2, True, 0, False),
+                              (3, False, 0, False, 1, True),
+                              (3, False, 2, False, 0, False),
+                              (2, False, 0, False, 0, False),
+                              (2, True, 0, False, 1, True)])
+
+    @patch('specprodDB.load.log')
+    @patch('specprodDB.load.dbSession')
+    @patch('specprodDB.load.Ztile.convert')
+    @patch('specprodDB.tile.read_redrock')
+    @patch('specprodDB.tile.findfile')
+    def test_load_redshift(self, mock_findfile, mock_read, mock_convert, mock_session, mock_log):
+        """Test reading redrock files for one tile.
+        """
+        tile = Tile(tileid=12345, survey='main', program='dark', lastnight=20210101)
+        mock_findfile.side_effect = [(f'redrock-{s:d}-12345-thru20210101.fits', s % 2 == 0) for s in range(10)]
+
+        def read(filename, **kwargs):
+            s = int(filename.split('-')[1])
+            redrock = Table({'TARGETID': np.array([s + 1, 2**59 + s], dtype=np.int64)})
+            fibermap = Table({'TILEID': np.array([12345, 12345]), 'NIGHT': np.array([20210101, 20201231 - s])})
+            return (redrock, fibermap)
+
+        mock_read.side_effect = read
+        mock_convert.side_effect = lambda *args, **kwargs: [Ztile(id=t, targetid=t)
+                                                            for t in args[0]['TARGETID'][kwargs['row_index']].tolist()]
+        ztile = load_redshift(tile)
+        self.assertListEqual([z.targetid for z in ztile], [1, 3, 5, 7, 9])
+        self.assertListEqual([c.args[4] for c in mock_convert.call_args_list], [20201231, 20201229, 20201227, 20201225, 20201223])
+        self.assertEqual(mock_read.call_args.kwargs, {'group': 'cumulative', 'recoadd_fibermap': True, 'pertile': True})
+        statement, = [c.args[0] for c in mock_session.execute.call_args_list]
+        compiled = statement.compile(dialect=postgresql.dialect())
+        self.assertIn('ON CONFLICT (id) DO UPDATE', str(compiled))
+        self.assertListEqual(sorted(v for k, v in compiled.params.items() if k.startswith('targetid')),
+                             [1, 3, 5, 7, 9])
+
+    def test_frame_rows(self):
+        """Test grouping of frames by exposure.
+        """
+        frames_expid = np.array([3, 1, 2, 1, 3, 2, 1])
+        self.assertListEqual(_frame_rows(frames_expid, [1, 3]).tolist(), [1, 3, 6, 0, 4])
+        self.assertListEqual(_frame_rows(frames_expid, [2]).tolist(), [2, 5])
+        with self.assertRaises(AssertionError):
+            _frame_rows(frames_expid, [1, 4])
+
+    @patch('specprodDB.load.dbSession')
+    def test_upsert(self, mock_session):
+        """Test chunked upsert.
+        """
+        _upsert([Tile(tileid=k, survey='main') for k in range(7)], chunksize=3)
+        mock_session.commit.assert_not_called()
+        compiled = [c.args[0].compile(dialect=postgresql.dialect()) for c in mock_session.execute.call_args_list]
+        for c in compiled:
+            self.assertIn('ON CONFLICT (tileid) DO UPDATE', str(c))
+        self.assertListEqual([sorted(v for k, v in c.params.items() if k.startswith('tileid')) for c in compiled],
+                             [[0, 1, 2], [3, 4, 5], [6]])
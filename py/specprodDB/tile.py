@@ -13,15 +13,18 @@ Some of this code may be combined or otherwise refactored with :mod:`specprodDB.
 in the future.
 """
 import os
-from configparser import SafeConfigParser
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 import numpy as np
 
+from astropy.io import fits
 from astropy.table import Table, join
 
+from sqlalchemy import any_, bindparam, insert, select, update, BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
 
-from desiutil.iers import freeze_iers
 # from desiutil.names import radec_to_desiname
 from desiutil.log import get_logger, DEBUG, INFO
 
@@ -31,12 +34,10 @@ from desispec.scripts.zcatalog import read_redrock
 from desispec.zcatalog import find_primary_spectra
 
 from . import load as db
-from .util import no_sky, common_options
-
-
-_fiberassign_cache = dict()
+from .util import no_sky, common_options, read_config
 
 
+@lru_cache(maxsize=4096)
 def fiberassign_file(tileid):
     """Find a fiberassign file associated with `tileid`.
 
@@ -49,15 +50,15 @@ def fiberassign_file(tileid):
     -------
     :class:`str`
         The path to the fiberassign file corresponding to tileid.
+
+    Notes
+    -----
+    The most recently used results are cached.
     """
-    global _fiberassign_cache
-    if tileid not in _fiberassign_cache:
-        f = findfile('fiberassignsvn', tile=tileid, readonly=True)
-        _fiberassign_cache[tileid] = f
-    return _fiberassign_cache[tileid]
+    return findfile('fiberassignsvn', tile=tileid, readonly=True)
 
 
-def potential_targets(tileid):
+def potential_targets(tileid, columns=None):
     """Find potential targets associated with `tileid`.
 
     Sky targets are not returned.
@@ -66,21 +67,61 @@ def potential_targets(tileid):
     ----------
     tileid : :class:`int`
         The Tile ID.
+    columns : :class:`list`, optional
+        Read only these columns from the ``TARGETS`` HDU. ``TARGETID`` is
+        always read. By default, read all columns.
 
     Returns
     -------
     :class:`~astropy.table.Table`
         A table containing potential target information.
     """
-    potential_targets_table = Table.read(fiberassign_file(tileid), format='fits', hdu='TARGETS')
+    if columns is None:
+        potential_targets_table = Table.read(fiberassign_file(tileid), format='fits', hdu='TARGETS')
+    else:
+        if 'TARGETID' not in columns:
+            columns = ['TARGETID'] + list(columns)
+        #
+        # Memory-map the HDU so that only the requested columns are
+        # copied into memory.
+        #
+        with fits.open(fiberassign_file(tileid), memmap=True, character_as_bytes=True) as hdulist:
+            targets_data = hdulist['TARGETS'].data
+            potential_targets_table = Table([targets_data[c] for c in columns], names=columns)
     db.log.debug("Found %d potential targets.", len(potential_targets_table))
     no_sky_rows = no_sky(potential_targets_table)
-    potential_targets_table = Table(potential_targets_table[no_sky_rows])
+    potential_targets_table = potential_targets_table[no_sky_rows]
     db.log.debug("%d potential targets remain after removing sky targets.", len(potential_targets_table))
     return potential_targets_table
 
 
-def potential_photometry(tile, targets):
+def _loaded_photometry(targetid):
+    """Find the subset of `targetid` already loaded into the Photometry table.
+
+    Parameters
+    ----------
+    targetid : :class:`list`
+        A list of ``TARGETID``.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        The ``TARGETID`` values that are already loaded.
+
+    Notes
+    -----
+    `targetid` is sent as a single array parameter, ``targetid = ANY(...)``,
+    rather than expanded into an ``IN (...)`` clause with one parameter per
+    value. The results are streamed directly into an array.
+    """
+    if len(targetid) == 0:
+        return np.zeros((0,), dtype=np.int64)
+    loaded_targetid = bindparam('targetid', targetid, type_=ARRAY(BigInteger))
+    q = select(db.Photometry.targetid).where(db.Photometry.targetid == any_(loaded_targetid))
+    return np.fromiter(db.dbSession.scalars(q.execution_options(yield_per=10000)), dtype=np.int64)
+
+
+def potential_photometry(tile, targets, overwrite=False):
     """Assemble a Table of targets that will be used to find photometric data.
 
     `targets` is assumed to come from one tile that has not already been loaded.
@@ -92,27 +133,36 @@ def potential_photometry(tile, targets):
         The tile associated with `targets`.
     targets : :class:`~astropy.table.Table`
         Effectively a list of ``TARGETID``.
+    overwrite : :class:`bool`, optional
+        If ``True``, the database was just created, so there is no existing
+        photometry to check for.
 
     Returns
     -------
     :class:`~astropy.table.Table`
         A Table that will be the input to photometric search functions.
     """
-    db.log.debug("Checking for existing photometry.")
-    potential_tractorphot_already_loaded = db.dbSession.query(db.Photometry.targetid).filter(db.Photometry.targetid.in_(targets['TARGETID'].tolist())).all()
+    if overwrite:
+        potential_tractorphot_already_loaded = np.zeros((0,), dtype=np.int64)
+    else:
+        db.log.debug("Checking for existing photometry.")
+        potential_tractorphot_already_loaded = _loaded_photometry(targets['TARGETID'].tolist())
     potential_tractorphot_not_already_loaded = np.ones((len(targets),), dtype=bool)
     if len(potential_tractorphot_already_loaded) > 0:
         db.log.info("Removing %d objects already loaded.", len(potential_tractorphot_already_loaded))
-    for row in potential_tractorphot_already_loaded:
-        potential_tractorphot_not_already_loaded[targets['TARGETID'] == row[0]] = False
-    potential_cat = Table()
-    potential_cat['TARGETID'] = targets['TARGETID'][potential_tractorphot_not_already_loaded]
-    potential_cat['TILEID'] = tile.tileid
-    potential_cat['TARGET_RA'] = targets['RA'][potential_tractorphot_not_already_loaded]
-    potential_cat['TARGET_DEC'] = targets['DEC'][potential_tractorphot_not_already_loaded]
-    # potential_cat['PETAL_LOC'] = targets['PETAL_LOC'][potential_tractorphot_not_already_loaded]
-    potential_cat['SURVEY'] = tile.survey
-    potential_cat['PROGRAM'] = tile.program
+        loaded_targetid = np.sort(potential_tractorphot_already_loaded)
+        targetid = np.asarray(targets['TARGETID'])
+        position = np.searchsorted(loaded_targetid, targetid)
+        position[position == len(loaded_targetid)] = len(loaded_targetid) - 1
+        potential_tractorphot_not_already_loaded = loaded_targetid[position] != targetid
+    n_potential = np.count_nonzero(potential_tractorphot_not_already_loaded)
+    potential_cat = Table({'TARGETID': targets['TARGETID'][potential_tractorphot_not_already_loaded],
+                           'TILEID': np.full(n_potential, tile.tileid),
+                           'TARGET_RA': targets['RA'][potential_tractorphot_not_already_loaded],
+                           'TARGET_DEC': targets['DEC'][potential_tractorphot_not_already_loaded],
+                           # 'PETAL_LOC': targets['PETAL_LOC'][potential_tractorphot_not_already_loaded],
+                           'SURVEY': np.full(n_potential, tile.survey),
+                           'PROGRAM': np.full(n_potential, tile.program)}, copy=False)
     return potential_cat
 
 
@@ -135,11 +185,10 @@ def targetphot(catalog):
     potential_targetphot['SURVEY'] = catalog['SURVEY']
     potential_targetphot['PROGRAM'] = catalog['PROGRAM']
     potential_targetphot['TILEID'] = catalog['TILEID']
-    inan = np.logical_or(np.isnan(potential_targetphot['PMRA']),
-                         np.isnan(potential_targetphot['PMDEC']))
-    if np.any(inan):
-        potential_targetphot['PMRA'][inan] = 0.0
-        potential_targetphot['PMDEC'][inan] = 0.0
+    inan = np.isnan(potential_targetphot['PMRA'])
+    inan |= np.isnan(potential_targetphot['PMDEC'])
+    np.copyto(potential_targetphot['PMRA'], 0.0, where=inan)
+    np.copyto(potential_targetphot['PMDEC'], 0.0, where=inan)
     return potential_targetphot
 
 
@@ -159,10 +208,61 @@ def tractorphot(catalog):
     db.log.debug("Starting gather_tractorphot(); %d objects in input catalog.", len(catalog))
     potential_tractorphot = gather_tractorphot(catalog, racolumn='TARGET_RA', deccolumn='TARGET_DEC')
     db.log.debug("Finished with gather_tractorphot(); %d objects found.", len(potential_tractorphot))
-    assert (np.where(potential_tractorphot['RELEASE'] == 0)[0] == np.where(potential_tractorphot['BRICKNAME'] == '')[0]).all()
+    assert np.array_equal(potential_tractorphot['RELEASE'] == 0, potential_tractorphot['BRICKNAME'] == '')
     return potential_tractorphot
 
 
+def _bulk_insert(cls, rows):
+    """Insert `rows` with a single executemany ``INSERT``, bypassing
+    the session unit-of-work.
+
+    Parameters
+    ----------
+    cls : :class:`type`
+        The ORM class corresponding to the table.
+    rows : :class:`list`
+        A list of :class:`dict` keyed by column name.
+    """
+    db.dbSession.execute(insert(cls), rows)
+    db.dbSession.commit()
+
+
+def _bulk_update(cls, rows):
+    """Update `rows` by primary key within the current transaction.
+
+    SQLAlchemy only batches consecutive parameter sets that have the same
+    keys into a single executemany ``UPDATE``, so `rows` are grouped by
+    their keys first, and each group is sent separately.
+
+    Parameters
+    ----------
+    cls : :class:`type`
+        The ORM class corresponding to the table.
+    rows : :class:`list`
+        A list of :class:`dict` keyed by column name, each containing the
+        primary key.
+    """
+    groups = dict()
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    for group in groups.values():
+        db.dbSession.execute(update(cls), group)
+
+
+def _upsert(rows, chunksize=500):
+    """Upsert ORM objects in chunks within the current transaction.
+
+    Parameters
+    ----------
+    rows : :class:`list`
+        A list of ORM objects. All items should be the same type.
+    chunksize : :class:`int`, optional
+        Upsert at most `chunksize` rows per statement (default 500).
+    """
+    for k in range(0, len(rows), chunksize):
+        db.dbSession.execute(db.upsert(rows[k:k+chunksize]))
+
+
 def load_photometry(photometry):
     """Insert the data in `photometry` into the database.
 
@@ -174,14 +274,12 @@ def load_photometry(photometry):
     Returns
     -------
     :class:`list`
-        A list of :class:`~specprodDB.load.Photometry` objects loaded.
+        A list of :class:`dict` containing the Photometry rows loaded.
     """
-    row_index = np.where(photometry['BRICKNAME'] != '')[0]
-    load_photometry = db.Photometry.convert(photometry, row_index=row_index)
+    row_index = np.flatnonzero(photometry['BRICKNAME'] != '')
+    load_photometry = db.Photometry.convert(photometry, row_index=row_index, mappings=True)
     if len(load_photometry) > 0:
-        # db.dbSession.rollback()
-        db.dbSession.add_all(load_photometry)
-        db.dbSession.commit()
+        _bulk_insert(db.Photometry, load_photometry)
         db.log.info("Loaded %d rows of Photometry data.", len(load_photometry))
     else:
         db.log.info("No Photometry data to load.")
@@ -197,12 +295,12 @@ def load_targetphot(targetphot, loaded_photometry):
     targetphot : :class:`~astropy.table.Table`
         A Table containing the targeting data.
     loaded_photometry : :class:`list`
-        A list of :class:`~specprodDB.load.Photometry` objects already loaded.
+        A list of :class:`dict` containing the Photometry rows already loaded.
 
     Returns
     -------
     :class:`list`
-        A list of :class:`~specprodDB.load.Photometry` objects loaded.
+        A list of :class:`dict` containing the Photometry rows loaded.
     """
     #
     # Find TARGETID not already *just* loaded.
@@ -210,8 +308,8 @@ def load_targetphot(targetphot, loaded_photometry):
     load_rows = np.zeros((len(targetphot),), dtype=bool)
     if len(loaded_photometry) > 0:
         loaded_targetid = Table()
-        loaded_targetid['TARGETID'] = np.array([r.targetid for r in loaded_photometry])
-        loaded_targetid['LS_ID'] = np.array([r.ls_id for r in loaded_photometry])
+        loaded_targetid['TARGETID'] = np.array([r['targetid'] for r in loaded_photometry])
+        loaded_targetid['LS_ID'] = np.array([r['ls_id'] for r in loaded_photometry])
         j = join(targetphot['TARGETID', 'RELEASE'], loaded_targetid, join_type='left', keys='TARGETID')
         try:
             load_targetids = j['TARGETID'][j['LS_ID'].mask]
@@ -222,22 +320,17 @@ def load_targetphot(targetphot, loaded_photometry):
             pass
         else:
             unique_targetid, targetid_index = np.unique(targetphot['TARGETID'].data, return_index=True)
-            for t in load_targetids:
-                load_rows[targetid_index[unique_targetid == t]] = True
+            load_rows[targetid_index[np.searchsorted(unique_targetid, load_targetids)]] = True
     #
     # Find TARGETID not loaded in previous cycles.
     #
-    targetphot_already_loaded = db.dbSession.query(db.Photometry.targetid).filter(db.Photometry.targetid.in_(targetphot[load_rows]['TARGETID'].tolist())).all()
-    targetphot_not_already_loaded = np.ones((len(targetphot),), dtype=bool)
-    for row in targetphot_already_loaded:
-        targetphot_not_already_loaded[targetphot['TARGETID'] == row[0]] = False
+    targetphot_already_loaded = _loaded_photometry(targetphot['TARGETID'][load_rows].tolist())
+    targetphot_not_already_loaded = np.isin(targetphot['TARGETID'], targetphot_already_loaded, invert=True)
 
     row_index = np.where(load_rows & targetphot_not_already_loaded)[0]
-    load_targetphot = db.Photometry.convert(targetphot, row_index=row_index)
+    load_targetphot = db.Photometry.convert(targetphot, row_index=row_index, mappings=True)
     if len(load_targetphot) > 0:
-        # db.dbSession.rollback()
-        db.dbSession.add_all(load_targetphot)
-        db.dbSession.commit()
+        _bulk_insert(db.Photometry, load_targetphot)
         db.log.info("Loaded %d rows of Photometry data (from targeting).", len(load_targetphot))
     else:
         db.log.info("No Photometry data (from targeting) to load.")
@@ -257,13 +350,11 @@ def load_target(tile, target):
     Returns
     -------
     :class:`list`
-        A list of :class:`~specprodDB.load.Target` objects loaded.
+        A list of :class:`dict` containing the Target rows loaded.
     """
-    load_target = db.Target.convert(target, tile.survey, tile.tileid)
+    load_target = db.Target.convert(target, tile.survey, tile.tileid, mappings=True)
     if len(load_target) > 0:
-        # db.dbSession.rollback()
-        db.dbSession.add_all(load_target)
-        db.dbSession.commit()
+        _bulk_insert(db.Target, load_target)
         db.log.info("Loaded %d rows of Target data.", len(load_target))
     else:
         db.log.info("No Target data to load.")
@@ -312,11 +403,16 @@ def load_redshift(tile, spgrp='cumulative'):
     if len(redrock_files) == 0:
         db.log.warning("No %s redrock or zbest files found for tile %d!", spgrp, tile.tileid)
         return []
+    #
+    # Reading redrock files is I/O-bound, so read them in parallel.
+    #
+    with ThreadPoolExecutor(max_workers=len(redrock_files)) as executor:
+        redrock_data = list(executor.map(partial(read_redrock, group=spgrp,
+                                                 recoadd_fibermap=True,
+                                                 pertile=True),
+                                         redrock_files))
     load_ztile = list()
-    for rr in redrock_files:
-        redrock_table, expfibermap = read_redrock(rr, group=spgrp,
-                                                  recoadd_fibermap=True,
-                                                  pertile=True)
+    for redrock_table, expfibermap in redrock_data:
         assert (expfibermap['TILEID'] == tile.tileid).all()
         #
         # In non-daily specprod, firstnight is a minimum over all petals.
@@ -329,8 +425,7 @@ def load_redshift(tile, spgrp='cumulative'):
                                        tile.tileid, firstnight,
                                        row_index=row_index)
     if len(load_ztile) > 0:
-        statement = db.upsert(load_ztile)
-        db.dbSession.execute(statement)
+        _upsert(load_ztile)
         # db.dbSession.add_all(load_ztile)
         db.dbSession.commit()
         db.log.info("Loaded %d rows of Ztile data.", len(load_ztile))
@@ -350,69 +445,75 @@ def load_fiberassign(tile):
     Returns
     -------
     :class:`tuple`
-        A tuple containing the lists of :class:`~specprodDB.load.Fiberassign`
-        and :class:`~specprodDB.load.Potential` objects loaded.
+        A tuple containing the lists of :class:`dict` for the Fiberassign
+        and Potential rows loaded.
     """
-    fiberassign_table = Table.read(fiberassign_file(tile.tileid), format='fits', hdu='FIBERASSIGN')
-    potential_table = Table.read(fiberassign_file(tile.tileid), format='fits', hdu='POTENTIAL_ASSIGNMENTS')
+    with fits.open(fiberassign_file(tile.tileid), memmap=False, character_as_bytes=True) as hdulist:
+        fiberassign_table = Table.read(hdulist['FIBERASSIGN'])
+        potential_table = Table.read(hdulist['POTENTIAL_ASSIGNMENTS'])
     row_index = no_sky(fiberassign_table)
-    load_fiberassign = db.Fiberassign.convert(fiberassign_table, tile.tileid, row_index=row_index)
+    load_fiberassign = db.Fiberassign.convert(fiberassign_table, tile.tileid, row_index=row_index, mappings=True)
     if len(load_fiberassign) > 0:
-        db.dbSession.add_all(load_fiberassign)
-        db.dbSession.commit()
+        _bulk_insert(db.Fiberassign, load_fiberassign)
         db.log.info("Loaded %d rows of Fiberassign data.", len(load_fiberassign))
     else:
         db.log.info("No Fiberassign data to load.")
     row_index = no_sky(potential_table)
-    load_potential = db.Potential.convert(potential_table, tile.tileid, row_index=row_index)
+    load_potential = db.Potential.convert(potential_table, tile.tileid, row_index=row_index, mappings=True)
     if len(load_potential) > 0:
-        db.dbSession.add_all(load_potential)
-        db.dbSession.commit()
+        _bulk_insert(db.Potential, load_potential)
         db.log.info("Loaded %d rows of Potential data.", len(load_potential))
     else:
         db.log.info("No Potential data to load.")
     return (load_fiberassign, load_potential)
 
 
+def _primary_table(ztile):
+    """Convert `ztile` into the input expected by :func:`~desispec.zcatalog.find_primary_spectra`.
+
+    Parameters
+    ----------
+    ztile : :class:`list`
+        A list of :class:`~specprodDB.load.Ztile` objects, or of rows
+        containing at least ``targetid``, ``zwarn`` and ``tsnr2_lrg``.
+
+    Returns
+    -------
+    :class:`~astropy.table.Table`
+        A Table containing ``TARGETID``, ``ZWARN`` and ``TSNR2_LRG``.
+    """
+    data = np.fromiter(((z.targetid, z.zwarn, z.tsnr2_lrg) for z in ztile),
+                       dtype=[('TARGETID', np.int64), ('ZWARN', np.int64), ('TSNR2_LRG', np.float64)],
+                       count=len(ztile))
+    return Table(data, copy=False)
+
+
 def update_primary():
     """Update the primary classification after some number of tiles has been loaded.
     """
-    zall_tilecumulative = db.dbSession.query(db.Ztile).all()
-    zall_table = Table(list(zip(*[(z.targetid, z.zwarn, z.tsnr2_lrg) for z in zall_tilecumulative])),
-                       names=('TARGETID', 'ZWARN', 'TSNR2_LRG'))
-    nspec, primary = find_primary_spectra(zall_table)
-    zcat_nspec, zcat_primary = nspec.tolist(), primary.tolist()
-    for k, z in enumerate(zall_tilecumulative):
-        z.zcat_nspec = zcat_nspec[k]
-        z.zcat_primary = zcat_primary[k]
-    db.dbSession.commit()
-    db.log.info("Updated primary classification for %d Ztile objects.", len(zall_tilecumulative))
-    sv_tilecumulative = db.dbSession.query(db.Ztile).filter(db.Ztile.survey.in_(('sv1', 'sv2', 'sv3'))).all()
-    if len(sv_tilecumulative) > 0:
-        sv_table = Table(list(zip(*[(z.targetid, z.zwarn, z.tsnr2_lrg) for z in sv_tilecumulative])),
-                         names=('TARGETID', 'ZWARN', 'TSNR2_LRG'))
-        nspec, primary = find_primary_spectra(sv_table)
-        sv_nspec, sv_primary = nspec.tolist(), primary.tolist()
-        for k, z in enumerate(sv_tilecumulative):
-            z.sv_nspec = sv_nspec[k]
-            z.sv_primary = sv_primary[k]
-        db.dbSession.commit()
-        db.log.info("Updated primary classification for %d SV Ztile objects.", len(sv_tilecumulative))
-    else:
-        db.log.info("No SV Ztile objects to update.")
-    main_tilecumulative = db.dbSession.query(db.Ztile).filter(db.Ztile.survey.in_(('main', ))).all()
-    if len(main_tilecumulative) > 0:
-        main_table = Table(list(zip(*[(z.targetid, z.zwarn, z.tsnr2_lrg) for z in main_tilecumulative])), names=('TARGETID', 'ZWARN', 'TSNR2_LRG'))
-        nspec, primary = find_primary_spectra(main_table)
-        main_nspec, main_primary = nspec.tolist(), primary.tolist()
-        for k, z in enumerate(main_tilecumulative):
-            z.main_nspec = main_nspec[k]
-            z.main_primary = main_primary[k]
+    ztile = db.dbSession.execute(select(db.Ztile.id, db.Ztile.targetid, db.Ztile.zwarn,
+                                        db.Ztile.tsnr2_lrg, db.Ztile.survey)).all()
+    zall_table = _primary_table(ztile)
+    zall_survey = np.array([z.survey for z in ztile])
+    updates = [{'id': z.id} for z in ztile]
+    for prefix, surveys, label in (('zcat', None, ''),
+                                   ('sv', ('sv1', 'sv2', 'sv3'), 'SV '),
+                                   ('main', ('main', ), 'Main ')):
+        if surveys is None:
+            row_index = np.arange(len(ztile))
+        else:
+            row_index = np.flatnonzero(np.isin(zall_survey, surveys))
+        if len(row_index) > 0:
+            nspec, primary = find_primary_spectra(zall_table[row_index])
+            for k, n, p in zip(row_index.tolist(), nspec.tolist(), primary.tolist()):
+                updates[k][f'{prefix}_nspec'] = n
+                updates[k][f'{prefix}_primary'] = p
+            db.log.info("Updated primary classification for %d %sZtile objects.", len(row_index), label)
+        else:
+            db.log.info("No %sZtile objects to update.", label)
+    if len(updates) > 0:
+        _bulk_update(db.Ztile, updates)
         db.dbSession.commit()
-        db.log.info("Updated primary classification for %d Main Ztile objects.", len(main_tilecumulative))
-    else:
-        db.log.info("No Main Ztile objects to update.")
-    return
 
 
 def update_q3c():
@@ -425,6 +526,31 @@ def update_q3c():
     return
 
 
+def _frame_rows(frames_expid, expid):
+    """Find the rows of a frames table that belong to each of `expid`.
+
+    Parameters
+    ----------
+    frames_expid : array-like
+        The ``EXPID`` column of a frames table.
+    expid : :class:`list`
+        A list of exposure IDs.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        The row indexes, grouped in the order of `expid`, and in the original
+        order within each exposure.
+    """
+    frames_expid = np.asarray(frames_expid)
+    order = np.argsort(frames_expid, kind='stable')
+    sorted_expid = frames_expid[order]
+    first = np.searchsorted(sorted_expid, expid, side='left')
+    last = np.searchsorted(sorted_expid, expid, side='right')
+    assert (last > first).all()
+    return np.concatenate([order[f:l] for f, l in zip(first.tolist(), last.tolist())])
+
+
 def get_options(description="Load data for one tile into a specprod database."):
     """Parse command-line options.
 
@@ -480,20 +606,21 @@ def main():
     #
     # Read configuration file.
     #
-    config = SafeConfigParser()
-    r = config.read(options.config)
-    if not (r and r[0] == options.config):
+    config = read_config(options.config)
+    if config is None:
         db.log.critical("Failed to read configuration file: %s!", options.config)
         return 1
     if specprod not in config:
         db.log.critical("Configuration has no section for '%s'!", specprod)
         return 1
+    specprod_config = config[specprod]
     #
     # Initialize DB.
     #
+    from desiutil.iers import freeze_iers
     freeze_iers()
-    postgresql = db.setup_db(hostname=config[specprod]['hostname'],
-                             username=config[specprod]['username'],
+    postgresql = db.setup_db(hostname=specprod_config['hostname'],
+                             username=specprod_config['username'],
                              schema=options.schema,
                              overwrite=options.overwrite,
                              public=options.public,
@@ -501,15 +628,13 @@ def main():
     #
     # Load configuration.
     #
-    release = config[specprod]['release']
-    photometry_version = config[specprod]['photometry']
-    # target_summary = config[specprod].getboolean('target_summary')
-    rsv = config[specprod]['redshift'].split('/')
-    if len(rsv) == 2:
-        redshift_type, redshift_version = rsv[0], rsv[1]
-    else:
-        redshift_type, redshift_version = rsv[0], 'v0'
-    tiles_version = config[specprod]['tiles']
+    release = specprod_config['release']
+    photometry_version = specprod_config['photometry']
+    # target_summary = specprod_config.getboolean('target_summary')
+    redshift_type, separator, redshift_version = specprod_config['redshift'].partition('/')
+    if not separator:
+        redshift_version = 'v0'
+    tiles_version = specprod_config['tiles']
     #
     # Complete initialization.
     #
@@ -542,7 +667,9 @@ def main():
         exposures_file = findfile('exposures', readonly=True)
     else:
         exposures_file = options.exposures_file
-    exposures_table = Table.read(exposures_file, format='fits', hdu='EXPOSURES')
+    with fits.open(exposures_file, memmap=False, character_as_bytes=True) as hdulist:
+        exposures_table = Table.read(hdulist['EXPOSURES'])
+        frames_table = Table.read(hdulist['FRAMES'])
     row_index = np.where((exposures_table['TILEID'] == candidate_tiles[0].tileid) & (exposures_table['EFFTIME_SPEC'] > 0))[0]
     if len(row_index) > 0:
         load_exposures = db.Exposure.convert(exposures_table, row_index=row_index)
@@ -550,15 +677,10 @@ def main():
         db.log.critical("No valid exposures found for tile %d, even though EFFTIME_SPEC == %f!",
                         candidate_tiles[0].tileid, candidate_tiles[0].efftime_spec)
         return 1
-    frames_table = Table.read(exposures_file, format='fits', hdu='FRAMES')
-    load_frames = list()
-    for exposure in load_exposures:
-        row_index = np.where(frames_table['EXPID'] == exposure.expid)[0]
-        assert len(row_index) > 0
-        load_frames += db.Frame.convert(frames_table, row_index=row_index)
+    row_index = _frame_rows(frames_table['EXPID'], [exposure.expid for exposure in load_exposures])
+    load_frames = db.Frame.convert(frames_table, row_index=row_index)
     try:
-        statement = db.upsert(candidate_tiles)
-        db.dbSession.execute(statement)
+        _upsert(candidate_tiles)
         # db.dbSession.add_all(candidate_tiles)
         db.dbSession.commit()
     except IntegrityError as exc:
@@ -572,8 +694,7 @@ def main():
         return 1
     new_tile = candidate_tiles[0]
     try:
-        statement = db.upsert(load_exposures)
-        db.dbSession.execute(statement)
+        _upsert(load_exposures)
         # db.dbSession.add_all(load_exposures)
         db.dbSession.commit()
     except IntegrityError as exc:
@@ -583,18 +704,24 @@ def main():
         db.dbSession.delete(new_tile)
         db.dbSession.commit()
         return 1
-    statement = db.upsert(load_frames)
-    db.dbSession.execute(statement)
+    _upsert(load_frames)
     # db.dbSession.add_all(load_frames)
     db.dbSession.commit()
     #
     # Load photometry. If this is an update, these should already be loaded.
     #
     if not options.update:
-        potential_targets_table = potential_targets(new_tile.tileid)
-        potential_cat = potential_photometry(new_tile, potential_targets_table)
-        potential_targetphot = targetphot(potential_cat)
-        potential_tractorphot = tractorphot(potential_cat)
+        potential_targets_table = potential_targets(new_tile.tileid, columns=['TARGETID', 'RA', 'DEC'])
+        potential_cat = potential_photometry(new_tile, potential_targets_table, overwrite=options.overwrite)
+        #
+        # Gathering targeting and Tractor photometry are independent and
+        # I/O-bound, so run them concurrently.
+        #
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_targetphot = executor.submit(targetphot, potential_cat)
+            future_tractorphot = executor.submit(tractorphot, potential_cat)
+            potential_targetphot = future_targetphot.result()
+            potential_tractorphot = future_tractorphot.result()
         loaded_photometry = load_photometry(potential_tractorphot)
         loaded_targetphot = load_targetphot(potential_targetphot, loaded_photometry)
         #
@@ -8,11 +8,15 @@ Classes and functions for use by all database code.
 """
 from sys import argv
 from argparse import ArgumentParser
+from configparser import ConfigParser
 from datetime import datetime
+from functools import lru_cache
+from os import stat
 from os.path import expanduser, exists, basename
+from urllib.parse import quote
 import importlib.resources as ir
 import numpy as np
-from desitarget.targets import decode_targetid
+from desitarget.targetmask import targetid_mask
 
 from . import __version__ as specprodDB_version
 
@@ -24,12 +28,17 @@ _decode_programid = dict([(v, k) for k, v in _programid.items()])
 _spgrpid = {'1x_depth': 1, '4x_depth': 2, 'cumulative': 3, 'lowspeed': 4,
             'perexp': 5, 'pernight': 6, 'healpix': 7}
 _decode_spgrpid = dict([(v, k) for k, v in _spgrpid.items()])
+_camera_band = np.full((256,), -1, dtype=np.int64)
+_camera_band[[ord('b'), ord('r'), ord('z')]] = [0, 10, 20]
 
 
+@lru_cache(maxsize=None)
 def cameraid(camera):
     """Converts `camera` (*e.g.* 'b0') to an integer in a simple but ultimately
     arbitrary way.
 
+    There are only 30 possible cameras, so the results are cached.
+
     Parameters
     ----------
     camera : :class:`str`
@@ -43,6 +52,32 @@ def cameraid(camera):
     return 'brz'.index(camera[0]) * 10 + int(camera[1])
 
 
+def cameraids(camera):
+    """Vectorized version of :func:`cameraid`.
+
+    Parameters
+    ----------
+    camera : array-like
+        Camera names, as :class:`str` or :class:`bytes`.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        An array of integers in the range [0, 29].
+
+    Raises
+    ------
+    ValueError
+        If any value of `camera` is not a valid camera name.
+    """
+    c = np.asarray(camera).astype('S2').view(np.uint8).reshape(-1, 2)
+    band = _camera_band[c[:, 0]]
+    spectrograph = c[:, 1].astype(np.int64) - ord('0')
+    if (band < 0).any() or (spectrograph < 0).any() or (spectrograph > 9).any():
+        raise ValueError("Invalid camera name!")
+    return band + spectrograph
+
+
 def frameid(expid, camera):
     """Converts the pair `expid`, `camera` into an arbitrary integer
     suitable for use as a primary key.
@@ -62,6 +97,24 @@ def frameid(expid, camera):
     return 100*expid + cameraid(camera)
 
 
+def frameids(expid, camera):
+    """Vectorized version of :func:`frameid`.
+
+    Parameters
+    ----------
+    expid : array-like
+        Exposure IDs associated with the frames.
+    camera : array-like
+        Camera names.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        An array of integers.
+    """
+    return 100*np.asarray(expid, dtype=np.int64) + cameraids(camera)
+
+
 def surveyid(survey):
     """Converts `survey` (*e.g.* 'main') to an integer in a simple but ultimately
     arbitrary way.
@@ -251,19 +304,36 @@ def convert_dateobs(timestamp, tzinfo=None):
     :class:`datetime.datetime`
         The converted `timestamp`.
     """
-    x = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f')
+    #
+    # datetime.fromisoformat() is much faster, but it accepts many more
+    # formats, including time zone offsets and more than six fractional
+    # digits, so only use it for input that looks like the expected format.
+    # Anything else goes through strptime, which rejects it as before.
+    #
+    x = None
+    if len(timestamp) <= 26 and timestamp[10:11] == 'T' and timestamp[19:20] == '.':
+        try:
+            x = datetime.fromisoformat(timestamp)
+        except ValueError:
+            pass
+    if x is None or x.tzinfo is not None:
+        x = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f')
     if tzinfo is not None:
         x = x.replace(tzinfo=tzinfo)
     return x
 
 
-def checkgzip(filename):
+def checkgzip(filename, listing=None):
     """Check for existence of `filename`, with or without a ``.gz`` extension.
 
     Parameters
     ----------
     filename : :class:`str`
         Filename to check.
+    listing : :class:`set`, optional
+        If set, test membership in this collection of paths instead of
+        querying the filesystem. This is useful when checking many files
+        in a directory that has already been listed.
 
     Returns
     -------
@@ -275,18 +345,15 @@ def checkgzip(filename):
     :exc:`FileNotFoundError`
         If neither file type exists.
     """
-    if exists(filename):
-        return filename
-
     if filename.endswith('.gz'):
         altfilename = filename[0:-3]
     else:
         altfilename = filename + '.gz'
 
-    if exists(altfilename):
-        return altfilename
-    else:
-        raise FileNotFoundError(f'Neither {filename} nor {altfilename} could be found!')
+    for f in (filename, altfilename):
+        if (f in listing if listing is not None else exists(f)):
+            return f
+    raise FileNotFoundError(f'Neither {filename} nor {altfilename} could be found!')
 
 
 def no_sky(catalog):
@@ -302,8 +369,10 @@ def no_sky(catalog):
     :class:`numpy.ndarray`
         The indexes of rows that are not sky targets.
     """
-    _, _, _, _, sky, _ = decode_targetid(catalog['TARGETID'])
-    return np.where((sky == 0) & (catalog['TARGETID'] > 0))[0]
+    targetid = np.asarray(catalog['TARGETID'])
+    keep = targetid > 0
+    keep &= (targetid & targetid_mask.SKY) == 0
+    return np.flatnonzero(keep)
 
 
 def parse_pgpass(hostname='specprod-db.desi.lbl.gov', username='desi_admin'):
@@ -322,26 +391,78 @@ def parse_pgpass(hostname='specprod-db.desi.lbl.gov', username='desi_admin'):
         A string suitable for creating a SQLAlchemy database engine, or None
         if no matching data was found.
     """
-    fmt = "postgresql://{3}:{4}@{0}:{1}/{2}"
+    pgpass = expanduser('~/.pgpass')
+    try:
+        st = stat(pgpass)
+    except FileNotFoundError:
+        return None
+    data = _read_pgpass(pgpass, st.st_mtime_ns, st.st_size)
+    if data is None or (hostname, username) not in data:
+        return None
+    port, database, password = data[(hostname, username)]
+    return f"postgresql://{username}:{quote(password, safe='')}@{hostname}:{port}/{database}"
+
+
+@lru_cache(maxsize=4)
+def _read_pgpass(filename, mtime, size):
+    """Parse a ``.pgpass`` file into connection parameters.
+
+    The results are cached, so the returned object should not be modified.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of the ``.pgpass`` file.
+    mtime : :class:`int`
+        Modification time of `filename` in nanoseconds.
+    size : :class:`int`
+        Size of `filename` in bytes.
+
+    Returns
+    -------
+    :class:`dict`
+        A mapping of ``(hostname, username)`` to a tuple of port, database
+        name and password, or ``None`` if `filename` does not exist.
+
+    Notes
+    -----
+    `mtime` and `size` are not used directly, but they are part of the
+    cache key, so a modified file is parsed again.
+    """
     try:
-        with open(expanduser('~/.pgpass')) as p:
+        with open(filename) as p:
             lines = p.readlines()
     except FileNotFoundError:
         return None
     data = dict()
     for l in lines:
-        d = l.strip().split(':')
-        if d[0] in data:
-            data[d[0]][d[3]] = fmt.format(*d)
-        else:
-            data[d[0]] = {d[3]: fmt.format(*d)}
-    if hostname not in data:
-        return None
-    try:
-        pgpass = data[hostname][username]
-    except KeyError:
+        d = l.rstrip('\r\n').split(':', 4)
+        if len(d) == 5:
+            data[(d[0], d[3])] = (d[1], d[2], d[4])
+    return data
+
+
+@lru_cache(maxsize=None)
+def read_config(filename):
+    """Read a configuration file.
+
+    The results are cached, so the returned object should not be modified.
+
+    Parameters
+    ----------
+    filename : :class:`str`
+        Name of the configuration file.
+
+    Returns
+    -------
+    :class:`~configparser.ConfigParser`
+        The parsed configuration, or ``None`` if `filename` could not be read.
+    """
+    config = ConfigParser()
+    r = config.read(filename)
+    if not (r and r[0] == filename):
         return None
-    return pgpass
+    return config
 
 
 def common_options(description):